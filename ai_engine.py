@@ -1,18 +1,127 @@
 # ai_engine.py
-from sentence_transformers import SentenceTransformer
+import math
+import multiprocessing
+import os
+import time
+
 import numpy as np
+from embedding_cache import CachedEncoder
+from onnx_encoder import build_model, cache_name, ensure_exported, load_encoder, resolve_backend
+
+MODEL_NAME = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
+# عدد الآيات في كل دفعة ترميز (MiniLM على المعالج: 32-128 هو الأفضل عادةً)
+BATCH_SIZE = 64
+# أجزاء لكل عملية: توزيع أفضل للحمل عندما تختلف أطوال الآيات
+SHARDS_PER_PROCESS = 4
 
 class Semantics:
-    def __init__(self):
+    def __init__(self, backend=None):
         print("⏳ Loading AI Model (MiniLM)...")
         # نموذج خفيف وسريع ويدعم العربية بشكل جيد للمقارنات
-        self.model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+        # المتجهات المحسوبة سابقاً تُقرأ من الذاكرة الدائمة بدل إعادة الترميز
+        # backend: "torch" أو "onnx" (نسخة int8 على المعالج)، الافتراضي من ENCODER_BACKEND
+        self.model = load_encoder(MODEL_NAME, backend)  # نفس مفتاح باقي الأدوات
 
     def embed(self, text):
         """تحويل النص إلى متجه رياضي"""
         return self.model.encode(text)
 
+    def embed_many(self, texts, batch_size=BATCH_SIZE):
+        """ترميز عدة نصوص دفعة واحدة: (len(texts), dim) بدل نداء لكل آية"""
+        return self.model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True)
+
     def similarity(self, vec1, vec2):
         """حساب نسبة التشابه (Cosine Similarity)"""
         # Dot product for normalized vectors is cosine similarity
-        return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
\ No newline at end of file
+        return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
+
+
+# =========================================================
+# MULTI-PROCESS ENCODING (full rebuilds)
+# =========================================================
+_WORKER_MODEL = None
+
+def _start_worker(factory, model_name, backend, threads):
+    global _WORKER_MODEL
+    _WORKER_MODEL = factory(model_name, backend, threads)
+
+def _encode_shard(job):
+    texts, batch_size = job
+    vectors = _WORKER_MODEL.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+class EncoderPool:
+    """
+    encode() مُوزَّع على عدة عمليات، لكل عملية نسختها من النموذج.
+    The texts are cut into contiguous shards and reassembled in input order.
+    Workers are spawned on the first encode() call, so a fully cached
+    rebuild never loads the model.
+    """
+
+    def __init__(self, processes=None, model_name=MODEL_NAME, backend="torch", factory=build_model):
+        self.processes = processes or os.cpu_count() or 1
+        # Split the cores between workers instead of every worker using all of them
+        threads = max(1, (os.cpu_count() or 1) // self.processes)
+        self._initargs = (factory, model_name, backend, threads)
+        self._pool = None
+        # Texts actually sent to the workers, and the wall time they took
+        self.encoded = 0
+        self.seconds = 0.0
+
+    def encode(self, texts, batch_size=BATCH_SIZE, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        start = time.perf_counter()
+        if self._pool is None:
+            ctx = multiprocessing.get_context("spawn")  # torch is not fork-safe
+            self._pool = ctx.Pool(self.processes, _start_worker, self._initargs)
+
+        size = max(1, math.ceil(len(texts) / (self.processes * SHARDS_PER_PROCESS)))
+        jobs = [(texts[i:i + size], batch_size) for i in range(0, len(texts), size)]
+        vectors = np.concatenate(self._pool.map(_encode_shard, jobs))
+        self.encoded += len(texts)
+        self.seconds += time.perf_counter() - start
+        return vectors[0] if single else vectors
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def encode_corpus(texts, processes=None, batch_size=BATCH_SIZE, model_name=MODEL_NAME,
+                  backend=None, cache=None, factory=build_model):
+    """
+    ترميز النصوص كلها على كل الأنوية: (len(texts), dim) بنفس الترتيب.
+    Cached vectors are read in this process; only the misses go to the pool.
+    Prints how many were cached, and the pool's throughput on the misses.
+    """
+    texts = list(texts)
+    backend = resolve_backend(backend)
+    if backend == "onnx":
+        ensure_exported(model_name)  # once, before the workers race to do it
+
+    start = time.perf_counter()
+    with EncoderPool(processes, model_name, backend, factory) as pool:
+        model = CachedEncoder(pool, cache_name(model_name, backend), cache)
+        vectors = model.encode(texts, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    # Throughput counts only the texts the workers encoded (worker start-up
+    # included); cache hits and in-call duplicates are reported apart
+    print(f"⚡ {len(texts)} verses in {elapsed:.1f}s: {len(texts) - pool.encoded} from the cache, "
+          f"{pool.encoded} encoded", end="")
+    if pool.encoded:
+        print(f" in {pool.seconds:.1f}s: {pool.encoded / max(pool.seconds, 1e-9):.0f} verses/s "
+              f"({pool.processes} processes)", end="")
+    print()
+    return vectors
@@ -1,16 +1,17 @@
 import streamlit as st
 import google.generativeai as genai
-import json, os, pickle, requests
+import json, os, pickle
 import numpy as np
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 from neo4j import GraphDatabase
 from pyvis.network import Network
 import streamlit.components.v1 as components
 from graph.graph_search import QuranGraphSearch
 from search.hybrid_search import hybrid_search
-from search.search_engine import search_verses
+from search.search_engine import QUERY_CACHE, hit_verse, search_page
+from search.index import SearchIndex
+from search.text_normalizer import normalize_semantic
+from search.ann import load_or_build
 from context_helpers import (
     build_context_package,
     format_context_for_prompt,
@@ -18,6 +19,9 @@ from context_helpers import (
     extract_practical_benefits
 )
 from session_manager import SessionManager
+from corpus import load_corpus
+from embedding_cache import QUERY_VECTORS, encode_query
+from onnx_encoder import load_encoder
 from local_session_manager import LocalSessionManager
 
 load_dotenv()
@@ -70,6 +74,22 @@ SURAH_NAMES = [
     "المسد", "الإخلاص", "الفلق", "الناس"
 ]
 
+# عدد الآيات في صفحة نتائج البحث المرتّب
+SEARCH_PAGE_SIZE = 20
+SUGGESTION_COUNT = 6
+VECTOR_INDEX_BACKEND = os.environ.get("VECTOR_INDEX_BACKEND", "ivf")  # "ivf" or "exact"
+
+def complete_last_word(key, word):
+    # Streamlit callback: replace the word being typed with the chosen completion
+    words = st.session_state.get(key, "").split()
+    st.session_state[key] = " ".join(words[:-1] + [word])
+
+def query_vector_stats():
+    # Debug view of the shared query-embedding LRU: hits = model.encode calls avoided
+    stats = QUERY_VECTORS.stats()
+    stats["avoided_encodes"] = stats["hits"]
+    return stats
+
 def format_ref(ref):
     try:
         s, a = ref.split(":")
@@ -124,30 +144,57 @@ st.markdown("""
 # ==========================================
 @st.cache_resource
 def load_engine():
-    model = SentenceTransformer(
-        "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
-    )
     with open("quran_topics_v2.json", encoding="utf-8") as f:
-        topics = json.load(f)["topics"]
-    with open("quran_topic_vectors_v2.pkl", "rb") as f:
+        data = json.load(f)
+    topics = data["topics"]
+    # Persistent embedding cache shared with the offline builders;
+    # ENCODER_BACKEND=onnx runs the int8 ONNX copy of the model (onnx_encoder.py).
+    # Query vectors must come from the backend the topic vectors were built
+    # with (older files: torch); the verse matrix (verse_embeddings.py) is torch
+    vectors_backend = data.get("backend", "torch")
+    model = load_encoder(
+        "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2", vectors_backend=vectors_backend
+    )
+    if vectors_backend != "torch":
+        print("⚠️ Topic vectors are int8 ONNX, the verse matrix is torch: semantic verse scores are approximate")
+    vectors_file = "quran_topic_vectors_v2.pkl"
+    with open(vectors_file, "rb") as f:
         vectors = np.array(pickle.load(f))
-    return model, topics, vectors
+    # ANN index over the topic vectors, rebuilt only when the .pkl changes
+    stat = os.stat(vectors_file)
+    index = load_or_build(
+        vectors, "quran_topic_vectors_v2.ann.npz", f"{stat.st_size}:{stat.st_mtime_ns}",
+        backend=VECTOR_INDEX_BACKEND,
+    )
+    return model, topics, index
 
-@st.cache_resource
+# load_corpus() remaps the snapshot when the file is rebuilt; the loaders below
+# are cached per corpus version, so a rebuild reaches the running app (and the
+# new index version invalidates QUERY_CACHE)
 def load_quran():
-    data = requests.get(
-        "https://raw.githubusercontent.com/risan/quran-json/main/dist/quran.json"
-    ).json()
-    verses = []
-    for s in data:
-        for a in s["verses"]:
-            verses.append({
-                "id": f"{s['id']}:{a['id']}",
-                "surah": s["id"],
-                "ayah": a["id"],
-                "text": a["text"]
-            })
-    return verses
+    return _load_quran(load_corpus().version)
+
+def load_verse_index():
+    return _load_verse_index(load_corpus().version)
+
+def load_search_index():
+    return _load_search_index(load_corpus().version)
+
+@st.cache_resource(max_entries=1)
+def _load_quran(version):
+    # Memory-mapped snapshot shared with every other loader (see corpus.py)
+    return load_corpus().verses()
+
+@st.cache_resource(max_entries=1)
+def _load_verse_index(version):
+    # O(1) lookup by "surah:ayah" over the same list load_quran() returns
+    return load_corpus().verse_index()
+
+@st.cache_resource(max_entries=1)
+def _load_search_index(version):
+    # Persisted next to the corpus snapshot, rebuilt when the corpus changes.
+    # The semantic stage uses the verse matrix from python verse_embeddings.py
+    return SearchIndex.from_corpus(load_corpus())
 
 @st.cache_resource
 def load_neo4j():
@@ -211,13 +258,12 @@ def build_network(driver, topic_id, topic_label=None):
 # ==========================================
 # 4. SEMANTIC TOPIC SEARCH (KEEP)
 # ==========================================
-def semantic_search(model, topics, vectors, q, k=5):
-    v = model.encode(q)
-    sims = cosine_similarity([v], vectors)[0]
-    idxs = np.argsort(sims)[-k:][::-1]
+def semantic_search(model, topics, index, q, k=5):
+    # Topic vectors are built from the "semantic" profile, like the query here
+    rows, sims = index.search(encode_query(model, normalize_semantic(q)), k)
     return [
-        {"id": topics[i]["id"], "ayahs": topics[i]["ayahs"], "score": sims[i]}
-        for i in idxs if sims[i] > 0.3
+        {"id": topics[i]["id"], "ayahs": topics[i]["ayahs"], "score": s}
+        for i, s in zip(rows, sims) if s > 0.3
     ]
 
 # ==========================================
@@ -342,7 +388,7 @@ def doctrine_checker(api_key, analysis_text):
     except:
         return True, "تجاوز تلقائي بسبب خطأ تقني في الفحص", False
 
-def handle_main_agent_query(agent_q, refs_input, agent_api_key, verses_db):
+def handle_main_agent_query(agent_q, refs_input, agent_api_key, verses_db, verse_index=None):
     verse_refs = []
     if refs_input:
         try:
@@ -360,7 +406,7 @@ def handle_main_agent_query(agent_q, refs_input, agent_api_key, verses_db):
 
     with st.status("🔍 بناء السياق الشامل...", expanded=True) as status:
         st.write("📝 استخراج الآيات المحورية والسياق...")
-        context_package = build_context_package(verse_refs, verses_db, agent_api_key)
+        context_package = build_context_package(verse_refs, verses_db, agent_api_key, index=verse_index)
         st.write(f"🔗 جمع الآيات المرتبطة: {len(context_package['related_verses'])} آية/آيات")
         st.write(f"💡 المفاهيم المستخلصة: {', '.join(context_package['key_concepts'][:3])}")
         formatted_context = format_context_for_prompt(context_package)
@@ -440,8 +486,10 @@ def get_topic_subject(api_key, verses_text):
         return "موضوع"
 
 def main():
-    model, topics, vectors = load_engine()
+    model, topics, topic_index = load_engine()
     verses = load_quran()
+    verse_index = load_verse_index()
+    search_index = load_search_index()
     neo = load_neo4j()
 
     st.title("🕋 محلل اللسان العربي المبين")
@@ -487,18 +535,64 @@ def main():
     # Display content based on selection
     if st.session_state.active_tab_name == "🔍 بحث في الآيات":
         # ---------- TAB 1: AYAH SEARCH ----------
-        q1 = st.text_input("ابحث في القرآن (كلمة أو معنى):", key="ayah_q")
+        q1 = st.text_input(
+            "ابحث في القرآن (كلمة أو معنى):",
+            key="ayah_q",
+            help='عبارة متصلة بين علامتي تنصيص: "رب العلمين" — كلمتان متقاربتان: الصبر NEAR/3 الصلوه'
+        )
+        # اقتراحات إكمال الكلمة الأخيرة (مصفوفة كلمات مرتبة + بحث ثنائي)
+        last_word = q1.split()[-1] if q1.strip() else ""
+        suggestions = search_index.suggest(last_word, SUGGESTION_COUNT) if last_word else []
+        if suggestions:
+            cols = st.columns(len(suggestions))
+            for col, (word, freq) in zip(cols, suggestions):
+                col.button(
+                    word, key=f"ayah_suggest_{word}", help=f"{freq} مرة",
+                    on_click=complete_last_word, args=("ayah_q", word)
+                )
+        ranking = st.radio(
+            "ترتيب النتائج:",
+            ["الأكثر صلة (BM25)", "كل المطابقات"],
+            horizontal=True,
+            key="ayah_mode"
+        )
+        search_mode = "bm25" if ranking.startswith("الأكثر") else "stages"
         if st.button("بحث الآيات", key="ayah_btn") and q1:
-            st.session_state.ayah_results = search_verses(q1, verses, model)
+            st.session_state.ayah_query = (q1, search_mode)
+            st.session_state.ayah_page = 0
         
-        if "ayah_results" in st.session_state:
-            if not st.session_state.ayah_results:
+        if "ayah_query" in st.session_state:
+            # صفحة واحدة فقط تُحسب في كل مرة (search_page يولّد النتائج بشكل كسول)
+            query, query_mode = st.session_state.ayah_query
+            page = st.session_state.get("ayah_page", 0)
+            hits = search_page(
+                query, verses, model, index=search_index, mode=query_mode,
+                limit=SEARCH_PAGE_SIZE + 1, offset=page * SEARCH_PAGE_SIZE,
+                cache=QUERY_CACHE
+            )
+            has_next = len(hits) > SEARCH_PAGE_SIZE
+            hits = hits[:SEARCH_PAGE_SIZE]
+            if not hits and page == 0:
                 st.warning("لا توجد نتائج منضبطة.")
-            for r in st.session_state.ayah_results:
+            for hit in hits:
+                r = hit_verse(hit, verses, search_index)
+                reason = hit.reason if hit.score is None else f"{hit.reason} {hit.score}"
                 st.markdown(
-                    f"<div class='ayah-box'>{r['text']}<br><small>{format_ref(str(r['surah']) + ':' + str(r['ayah']))} — {r['reason']}</small></div>",
+                    f"<div class='ayah-box'>{r['text']}<br><small>{format_ref(str(r['surah']) + ':' + str(r['ayah']))} — {reason}</small></div>",
                     unsafe_allow_html=True
                 )
+            
+            prev_col, page_col, next_col = st.columns([1, 2, 1])
+            if page > 0 and prev_col.button("→ السابق", key="ayah_prev"):
+                st.session_state.ayah_page = page - 1
+                st.rerun()
+            page_col.caption(f"صفحة {page + 1}")
+            if has_next and next_col.button("التالي ←", key="ayah_next"):
+                st.session_state.ayah_page = page + 1
+                st.rerun()
+            
+            with st.expander("🛠️ ذاكرة نتائج البحث (debug)"):
+                st.json({"results": QUERY_CACHE.stats(), "query_vectors": query_vector_stats()})
 
     elif st.session_state.active_tab_name == "🧠 تدبر موضوعي":
         # ---------- TAB 2: TOPIC + GRAPH ----------
@@ -523,12 +617,15 @@ def main():
                 st.session_state.tadabbur_results = graph_engine.search_by_concept(q2)
                 st.session_state.tadabbur_type = "graph"
             elif search_mode == "بحث هجين" and graph_engine:
-                st.session_state.tadabbur_results = hybrid_search(q2, model, vectors, topics, graph_engine)
+                st.session_state.tadabbur_results = hybrid_search(q2, model, topic_index, topics, graph_engine)
                 st.session_state.tadabbur_type = "hybrid"
             else:
-                st.session_state.tadabbur_results = semantic_search(model, topics, vectors, q2)
+                st.session_state.tadabbur_results = semantic_search(model, topics, topic_index, q2)
                 st.session_state.tadabbur_type = "semantic"
 
+        with st.expander("🛠️ ذاكرة متجهات الأسئلة (debug)"):
+            st.json(query_vector_stats())
+
         if "tadabbur_results" in st.session_state:
             results = st.session_state.tadabbur_results
             t_type = st.session_state.tadabbur_type
@@ -565,7 +662,7 @@ def main():
                     refs = fetch_ayahs(neo, tid) if neo else next((t['ayahs'] for t in topics if t['id'] == tid), [])
                     topic_texts = []
                     for ref in refs:
-                        v = next((x for x in verses if x["id"] == ref), None)
+                        v = verse_index.get(ref)
                         if v: topic_texts.append(v["text"])
                     
                     # Generate dynamic subject
@@ -692,7 +789,7 @@ def main():
             if st.button("🚀 استنطاق الوكيل الرئيسي", key="main_agent_btn") and agent_q:
                 if not agent_api_key: st.error("⚠️ يرجى إدخال مفتاح API أولاً.")
                 else:
-                    response, context_pkg = handle_main_agent_query(agent_q, refs_input, agent_api_key, verses)
+                    response, context_pkg = handle_main_agent_query(agent_q, refs_input, agent_api_key, verses, verse_index)
                     if response:
                         # Create session if doesn't exist
                         if st.session_state.session_manager and not st.session_state.current_session_id:
@@ -1,48 +1,44 @@
-import requests
 import json
 import numpy as np
 import pickle
-import re
-from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
+from corpus import load_corpus
+from onnx_encoder import BACKENDS, load_encoder
+from quantization import compact_path, compress
+from search.text_normalizer import normalize_semantic
 
 # --- إعدادات النموذج ---
 # نستخدم نموذجاً يدعم العربية بكفاءة عالية للفهم الدلالي
 MODEL_NAME = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
 
-def normalize_text(text):
-    # توحيد الرسم الإملائي للبحث (اختياري لأن النموذج يفهم المعنى، لكنه مفيد)
-    text = re.sub(r'[\u064B-\u065F\u0670\u06D6-\u06ED\u06E5\u06E6]', '', text)
-    text = text.replace("ٱ", "ا").replace("إ", "ا").replace("أ", "ا").replace("آ", "ا")
-    text = text.replace("ة", "ه").replace("ى", "ي")
-    return text
+# توحيد الرسم الإملائي للبحث: نفس ملف "semantic" المحسوب مسبقاً في لقطة المصحف
+normalize_text = normalize_semantic
 
 def load_quran_data():
     print("📥 تحميل بيانات القرآن...")
-    url = "https://raw.githubusercontent.com/risan/quran-json/main/dist/quran.json"
-    response = requests.get(url)
-    data = response.json()
+    corpus = load_corpus()
+    texts = corpus.strings("text")
+    clean = corpus.normalized("semantic")
     formatted_data = {}
     
-    for surah in data:
-        surah_name = surah['name']
+    for surah_id, surah_name, start, stop in corpus.surahs():
         verses = []
-        for ayah in surah['verses']:
+        for i in range(start, stop):
             # نحتفظ بالنص الأصلي وبالنص المعالج
-            clean_text = normalize_text(ayah['text'])
             verses.append({
-                "number": ayah['id'],
-                "text": ayah['text'],
-                "clean_text": clean_text,
-                "ref": f"{surah_name} ({surah['id']}:{ayah['id']})"
+                "number": corpus.verse_ayah[i],
+                "text": texts[i],
+                "clean_text": clean[i],
+                "ref": f"{surah_name} ({surah_id}:{corpus.verse_ayah[i]})"
             })
         formatted_data[surah_name] = verses
     return formatted_data
 
-def process_quran_vectors():
-    print("🧠 جاري تحميل نموذج الذكاء الاصطناعي (قد يستغرق وقتاً لأول مرة)...")
-    model = SentenceTransformer(MODEL_NAME)
-    
+def process_quran_vectors(precision=None, processes=None, backend=None):
+    """
+    processes: ترميز المقاطع على عدة عمليات (0 = كل الأنوية)
+    backend: "torch" أو "onnx" (الافتراضي من ENCODER_BACKEND)
+    """
     quran = load_quran_data()
     all_topics = []
     global_topic_id = 0
@@ -67,21 +63,31 @@ def process_quran_vectors():
             if len(current_chunk_verses) >= 5 or i == len(verses) - 1:
                 global_topic_id += 1
                 
-                # *** السحر هنا: نحسب "متجه المعنى" لهذا المقطع كاملاً ***
-                topic_vector = model.encode(current_chunk_text.strip())
-                
+                # "متجه المعنى" لكل مقطع يُحسب بعد التقسيم، دفعة واحدة
                 all_topics.append({
                     "id": global_topic_id,
                     "surah": surah_name,
                     "verses": current_chunk_verses,
                     "full_text": current_chunk_text.strip(), # للنص الكامل
-                    "vector": topic_vector # البصمة الرياضية للمعنى
                 })
                 
                 # إعادة تعيين للموضوع القادم
                 current_chunk_verses = []
                 current_chunk_text = ""
 
+    # *** السحر هنا: البصمة الرياضية للمعنى لكل المقاطع ***
+    chunk_texts = [t['full_text'] for t in all_topics]
+    if processes is not None:
+        from ai_engine import encode_corpus
+        vectors = encode_corpus(chunk_texts, processes or None, model_name=MODEL_NAME, backend=backend)
+    else:
+        print("🧠 جاري تحميل نموذج الذكاء الاصطناعي (قد يستغرق وقتاً لأول مرة)...")
+        # ذاكرة المتجهات الدائمة: المقاطع المرمّزة سابقاً لا تمر على النموذج مرة أخرى
+        model = load_encoder(MODEL_NAME, backend)
+        vectors = model.encode(chunk_texts)
+    for t, vec in zip(all_topics, vectors):
+        t['vector'] = vec
+
     # فصل البيانات (النصية) عن (الرياضية) للحفظ
     json_data = []
     vectors_data = []
@@ -104,8 +110,20 @@ def process_quran_vectors():
     # 2. حفظ المتجهات للبحث الذكي
     with open("topic_embeddings.pkl", "wb") as f:
         pickle.dump(np.array(vectors_data), f)
+
+    # 3. نسخة مضغوطة اختيارية (float16 / int8) - انظر quantization.py
+    if precision:
+        compress(vectors_data, precision).save(compact_path("topic_embeddings.pkl", precision))
         
     print("✅ تم بناء الأطلس الذكي بنجاح!")
 
 if __name__ == "__main__":
-    process_quran_vectors()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="بناء أطلس المواضيع")
+    parser.add_argument("--precision", choices=["float16", "int8"], help="حفظ نسخة مضغوطة من المتجهات أيضاً")
+    parser.add_argument("--processes", type=int, help="ترميز على عدة عمليات (0 = كل الأنوية)")
+    parser.add_argument("--backend", choices=BACKENDS, help="محرك الترميز (الافتراضي من ENCODER_BACKEND)")
+    args = parser.parse_args()
+
+    process_quran_vectors(precision=args.precision, processes=args.processes, backend=args.backend)
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Benchmark: int8 ONNX encoder vs the PyTorch SentenceTransformer
+
+    python bench_encoder.py [--repeat 5] [--batch-size 64]
+
+Exports the ONNX model first if onnx_models/ has none (onnx_encoder.py).
+Both encoders are called directly, bypassing the embedding cache. Reports
+single-query latency (the tadabbur tab's case), batch throughput on verse
+texts, and parity: the cosine between the two backends' vectors for the same
+text, and how often the top-5 verses of a query agree.
+"""
+
+import os
+import time
+
+import numpy as np
+
+from bench_quantization import QUERIES
+from onnx_encoder import MODEL_NAME, QUANTIZED_FILE, OnnxEncoder, export, model_dir
+from search.vector_index import VectorIndex
+
+
+def load_texts(limit=512):
+    try:
+        from corpus import load_corpus
+        texts = load_corpus().normalized("semantic")
+    except Exception:
+        return QUERIES * (limit // len(QUERIES))
+    return list(texts[:limit])
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def run(repeat=5, batch_size=64):
+    from sentence_transformers import SentenceTransformer
+
+    path = model_dir(MODEL_NAME)
+    if not os.path.exists(os.path.join(path, QUANTIZED_FILE)):
+        export(MODEL_NAME, path)
+    encoders = {"torch": SentenceTransformer(MODEL_NAME, device="cpu"), "onnx-int8": OnnxEncoder(path)}
+    texts = load_texts()
+
+    vectors = {}
+    print(f"📊 {len(QUERIES)} queries, {len(texts)} verse texts, batch {batch_size}")
+    for name, model in encoders.items():
+        model.encode(QUERIES[:2])  # warm-up
+        single, q_vecs = timed(lambda: np.stack([model.encode(q) for q in QUERIES]), repeat)
+        batch, t_vecs = timed(lambda: model.encode(texts, batch_size=batch_size), repeat)
+        vectors[name] = (np.asarray(q_vecs, dtype=np.float32), np.asarray(t_vecs, dtype=np.float32))
+        print(
+            f"   {name:<10} {single / len(QUERIES) * 1e3:8.2f} ms/query"
+            f"   {len(texts) / batch:8.1f} verses/s (batched)"
+        )
+
+    (q_ref, t_ref), (q_new, t_new) = vectors["torch"], vectors["onnx-int8"]
+    both = VectorIndex(np.concatenate([q_ref, t_ref]))
+    other = VectorIndex(np.concatenate([q_new, t_new]))
+    parity = (both.vectors * other.vectors).sum(axis=1)
+    top_ref = VectorIndex(t_ref).search_many(q_ref, k=5)[0]
+    top_new = VectorIndex(t_new).search_many(q_new, k=5)[0]
+    overlap = np.mean([len(set(a) & set(b)) / 5 for a, b in zip(top_ref, top_new)])
+    print(f"   parity: cosine mean {parity.mean():.4f}, min {parity.min():.4f}; top-5 overlap {overlap:.3f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the int8 ONNX encoder")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes per backend")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    run(args.repeat, args.batch_size)
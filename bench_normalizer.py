@@ -0,0 +1,64 @@
+"""
+Micro-benchmark: table-driven normalizer vs the original regex + replace chain
+
+    python bench_normalizer.py [--snapshot quran_corpus.bin] [--repeat 20]
+
+Runs over the full corpus, checks the outputs are identical, and reports
+the best time per pass for each implementation.
+"""
+
+import re
+import time
+
+from corpus import SNAPSHOT_FILE, load_corpus
+from search.text_normalizer import normalize, normalize_many
+
+# The original search/text_normalizer.normalize, kept here as the baseline
+LEGACY_DIACRITICS = re.compile(r"[\u064B-\u0652\u0640]")
+
+def legacy_normalize(text):
+    text = LEGACY_DIACRITICS.sub("", text)
+    text = text.replace("أ", "ا").replace("إ", "ا").replace("آ", "ا")
+    text = text.replace("ة", "ه")
+    text = text.replace("ى", "ي")
+    return text.strip()
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(snapshot=SNAPSHOT_FILE, repeat=20):
+    texts = load_corpus(snapshot).strings("text")
+
+    expected = [legacy_normalize(t) for t in texts]
+    assert [normalize(t) for t in texts] == expected, "normalize() output differs"
+    assert normalize_many(texts) == expected, "normalize_many() output differs"
+
+    timings = {
+        "legacy regex+replace": best_of(lambda: [legacy_normalize(t) for t in texts], repeat),
+        "normalize (translate)": best_of(lambda: [normalize(t) for t in texts], repeat),
+        "normalize_many (batch)": best_of(lambda: normalize_many(texts), repeat),
+    }
+
+    baseline = timings["legacy regex+replace"]
+    print(f"📊 {len(texts)} verses, best of {repeat} runs (outputs identical)")
+    for name, seconds in timings.items():
+        print(f"   {name:<24} {seconds * 1000:8.2f} ms   x{baseline / seconds:5.1f}")
+    return timings
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the Arabic normalizers")
+    parser.add_argument("--snapshot", default=SNAPSHOT_FILE, help="Corpus snapshot path")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed passes per implementation")
+    args = parser.parse_args()
+
+    run(args.snapshot, args.repeat)
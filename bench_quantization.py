@@ -0,0 +1,91 @@
+"""
+Benchmark: float16 / int8 vector storage vs the float32 baseline
+
+    python bench_quantization.py [--vectors quran_topic_vectors_v2.pkl] [--k 10]
+
+Vectors: the verse embedding matrix of the corpus snapshot (python
+verse_embeddings.py), or any pickled / .npy topic matrix given with
+--vectors. Queries: encoded from QUERIES when sentence-transformers is
+installed, else the stored vectors themselves with noise added.
+Reports memory, latency per query and recall@k against float32.
+"""
+
+import pickle
+import time
+
+import numpy as np
+
+from quantization import FORMATS, compress
+
+# The questions users actually type in the search and tadabbur tabs
+QUERIES = [
+    "الصبر", "الرحمة", "التوبة", "الجنة", "النار", "يوم القيامة", "قصة موسى وفرعون",
+    "الصلاة", "الزكاة", "بر الوالدين", "الظلم", "الشكر", "الخوف والرجاء", "التوكل على الله",
+    "خلق السماوات والأرض", "الأنبياء", "الإنفاق في سبيل الله", "الصدق", "النفاق", "الموت",
+]
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+
+def load_vectors(path=None):
+    if path is None:
+        from corpus import load_corpus
+        from verse_embeddings import load_embeddings
+
+        matrix = load_embeddings(load_corpus())
+        if matrix is None:
+            raise SystemExit("No verse matrix: run python verse_embeddings.py or pass --vectors")
+        return np.asarray(matrix, dtype=np.float32)
+    if path.endswith(".npy"):
+        return np.load(path).astype(np.float32)
+    with open(path, "rb") as f:
+        return np.asarray(pickle.load(f), dtype=np.float32)
+
+
+def load_queries(matrix, seed=0):
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        rng = np.random.default_rng(seed)
+        picks = matrix[rng.choice(len(matrix), size=min(200, len(matrix)), replace=False)]
+        return picks + rng.normal(0, picks.std(), picks.shape).astype(np.float32)
+    return np.asarray(SentenceTransformer(MODEL_NAME).encode(QUERIES), dtype=np.float32)
+
+
+def run(path=None, k=10, repeat=5):
+    matrix = load_vectors(path)
+    queries = load_queries(matrix)
+    k = min(k, len(matrix))
+    baseline = compress(matrix, "float32")
+    truth = [set(rows.tolist()) for rows in baseline.top_k_many(queries, k)[0]]
+
+    print(f"📊 {matrix.shape[0]} × {matrix.shape[1]} vectors, {len(queries)} queries, top-{k}")
+    for fmt in FORMATS:
+        compact = compress(matrix, fmt)
+        single = batch = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for q in queries:
+                compact.top_k(q, k)
+            single = min(single, time.perf_counter() - start)
+            start = time.perf_counter()
+            results = compact.top_k_many(queries, k)[0]
+            batch = min(batch, time.perf_counter() - start)
+        recall = np.mean([len(truth[i] & set(r.tolist())) / k for i, r in enumerate(results)])
+        print(
+            f"   {fmt:<8} {compact.nbytes / 1024:10.1f} KiB"
+            f"   {single / len(queries) * 1e6:8.1f} µs/query"
+            f"   {batch / len(queries) * 1e6:8.1f} µs/query (batched)"
+            f"   recall@{k} {recall:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark reduced-precision vector storage")
+    parser.add_argument("--vectors", help="Pickled / .npy matrix (default: verse embeddings)")
+    parser.add_argument("--k", type=int, default=10, help="Top-k for recall")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes per format")
+    args = parser.parse_args()
+
+    run(args.vectors, args.k, args.repeat)
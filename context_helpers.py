@@ -1,11 +1,12 @@
 import requests
 import json
+from corpus import VerseIndex
 
 # ==========================================
 # CONTEXT EXTRACTION HELPERS
 # ==========================================
 
-def get_surrounding_verses(verse_ref, verses, before=2, after=2):
+def get_surrounding_verses(verse_ref, verses, before=2, after=2, index=None):
     """
     Get verses before and after a specific verse for context
     
@@ -14,37 +15,25 @@ def get_surrounding_verses(verse_ref, verses, before=2, after=2):
         verses: list of verse dicts
         before: number of verses before
         after: number of verses after
+        index: optional VerseIndex over verses (built on the fly if missing)
     
     Returns:
         dict with before, target, after verses
     """
     try:
         surah, ayah = map(int, verse_ref.split(":"))
+        index = index or VerseIndex(verses)
         
-        context = {
-            "before": [],
-            "target": None,
-            "after": [],
+        # Same-surah neighbours are contiguous slices of the index
+        before_verses, target, after_verses = index.window(verse_ref, before, after)
+        
+        return {
+            "before": before_verses,
+            "target": target,
+            "after": after_verses,
             "surah_name": get_surah_name(surah)
         }
         
-        # Get verses from same surah
-        surah_verses = [v for v in verses if v["surah"] == surah]
-        
-        for v in surah_verses:
-            if v["ayah"] == ayah:
-                context["target"] = v
-            elif v["ayah"] < ayah and v["ayah"] >= ayah - before:
-                context["before"].append(v)
-            elif v["ayah"] > ayah and v["ayah"] <= ayah + after:
-                context["after"].append(v)
-        
-        # Sort before/after
-        context["before"].sort(key=lambda x: x["ayah"])
-        context["after"].sort(key=lambda x: x["ayah"])
-        
-        return context
-        
     except Exception as e:
         return None
 
@@ -61,23 +50,25 @@ def get_surah_name(surah_id):
     except:
         return f"سورة {surah_id}"
 
-def find_related_verses_by_root(keyword, verses, max_results=5):
+def find_related_verses_by_concepts(concepts, verses, max_results=5):
     """
-    Find verses containing the same root word
-    Simple implementation - could be enhanced with proper Arabic morphology
+    Verses containing each concept (normalized substring match); every
+    concept is looked up in the same pass over the verses (shared matcher,
+    search.multi_matcher). Returns {concept: [verses]}, in corpus order.
     """
-    from search.search_engine import normalize_arabic
-    
-    normalized_keyword = normalize_arabic(keyword)
-    related = []
+    from search.text_normalizer import normalize
+    from search.multi_matcher import matcher
     
-    for v in verses:
-        normalized_text = normalize_arabic(v["text"])
-        if normalized_keyword in normalized_text:
-            related.append(v)
-            if len(related) >= max_results:
-                break
+    keys = [normalize(c) for c in concepts]
+    texts = [v.get("normalized") or normalize(v["text"]) for v in verses]
+    auto = matcher(keys)
+    hits = auto.rows(texts)
     
+    ids = {pattern: pid for pid, pattern in enumerate(auto.patterns)}
+    related = {}
+    for concept, key in zip(concepts, keys):
+        rows = hits.get(ids.get(key), [])[:max_results]
+        related[concept] = [verses[i] for i in rows]
     return related
 
 def extract_key_concepts(text, api_key=None):
@@ -110,10 +101,12 @@ def extract_key_concepts(text, api_key=None):
         words = text.split()
         return [w.strip("،؛.") for w in words if len(w) > 3][:3]
 
-def build_context_package(verse_refs, verses, api_key=None):
+def build_context_package(verse_refs, verses, api_key=None, index=None):
     """
     Build a comprehensive context package for AI analysis
     
+    Pass the shared VerseIndex of `verses` as `index` to skip rebuilding it.
+    
     Returns:
         dict with:
         - target_verses: the main verses
@@ -128,17 +121,19 @@ def build_context_package(verse_refs, verses, api_key=None):
         "related_verses": []
     }
     
+    index = index or VerseIndex(verses)
+    
     # Process each reference
     for ref in verse_refs:
         # Get target verse
-        target = next((v for v in verses if v["id"] == ref), None)
+        target = index.get(ref)
         if not target:
             continue
             
         package["target_verses"].append(target)
         
         # Get surrounding context
-        context = get_surrounding_verses(ref, verses, before=2, after=2)
+        context = get_surrounding_verses(ref, verses, before=2, after=2, index=index)
         if context:
             package["surrounding_context"][ref] = context
         
@@ -150,9 +145,10 @@ def build_context_package(verse_refs, verses, api_key=None):
     package["key_concepts"] = list(set(package["key_concepts"]))
     
     # Find related verses based on key concepts
-    for concept in package["key_concepts"][:2]:  # Limit to top 2 concepts
-        related = find_related_verses_by_root(concept, verses, max_results=3)
-        package["related_verses"].extend(related)
+    top_concepts = package["key_concepts"][:2]  # Limit to top 2 concepts
+    related = find_related_verses_by_concepts(top_concepts, verses, max_results=3)
+    for concept in top_concepts:
+        package["related_verses"].extend(related[concept])
     
     # Remove duplicates
     seen = set()
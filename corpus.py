@@ -0,0 +1,532 @@
+"""
+Quran Corpus Snapshot - نسخة ثنائية محلية من نص القرآن
+
+The Quran text is fetched once, written to a versioned binary snapshot
+(fixed-width offset tables + a UTF-8 text blob) and memory-mapped at startup.
+Every entry point (app, quran_utils, quran_analyzer_v2, backend_builder) reads
+from the same mapped file, so loading takes milliseconds, needs no network,
+and the pages are shared between worker processes.
+
+Build the snapshot explicitly with:
+    python corpus.py                     # download from GitHub
+    python corpus.py --source quran.json # from a local copy
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+
+from search.text_normalizer import PROFILES, STRIPPED, TABLES, normalize_many
+from search.root_matcher import extract_root
+
+# =========================================================
+# CONFIGURATION
+# =========================================================
+SOURCE_URL = "https://raw.githubusercontent.com/risan/quran-json/main/dist/quran.json"
+SNAPSHOT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quran_corpus.bin")
+
+MAGIC = b"QRNC"
+FORMAT_VERSION = 7
+HEADER = struct.Struct("<4sII")  # magic, format version, table-of-contents length
+ALIGN = 8
+
+WORD = re.compile(r"\S+")
+
+
+# =========================================================
+# SOURCE
+# =========================================================
+def fetch_source(url=SOURCE_URL):
+    """تحميل ملف القرآن الخام (risan/quran-json) من GitHub"""
+    import requests
+
+    response = requests.get(url)
+    response.raise_for_status()
+    return response.json()
+
+
+# =========================================================
+# SNAPSHOT WRITER
+# =========================================================
+def _u32(values):
+    arr = array("I", values)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _string_column(strings):
+    """Encode a list of strings as (byte offsets table, UTF-8 blob)"""
+    offsets = [0]
+    chunks = []
+    total = 0
+    for s in strings:
+        b = s.encode("utf-8")
+        chunks.append(b)
+        total += len(b)
+        offsets.append(total)
+    return _u32(offsets), b"".join(chunks)
+
+
+def _token_table(texts):
+    """
+    Word-level token table as flat columns.
+
+    Tokens are the whitespace-separated words of the Uthmani text; a
+    token's normalized form may be empty (a standalone waqf sign), which
+    is why the Uthmani and normalized splits of a verse do not line up.
+    """
+    tok_verse, tok_word, tok_start, tok_end, verse_tok_start = [], [], [], [], [0]
+    forms = {profile: [] for profile in PROFILES}
+    positions = {profile: [] for profile in PROFILES}
+
+    for row, text in enumerate(texts):
+        spans = [(m.start(), m.end()) for m in WORD.finditer(text)]
+        for w, (start, end) in enumerate(spans):
+            tok_verse.append(row)
+            tok_word.append(w)
+            tok_start.append(start)
+            tok_end.append(end)
+        verse_tok_start.append(len(tok_verse))
+
+        for profile, table in TABLES.items():
+            # Char offset of each form inside the profile's normalized verse text
+            full = text.translate(table)
+            lead = len(full) - len(full.lstrip()) if profile in STRIPPED else 0
+            length, prev = 0, 0
+            for start, end in spans:
+                length += len(text[prev:start].translate(table))
+                form = text[start:end].translate(table)
+                forms[profile].append(form)
+                positions[profile].append(max(0, length - lead))
+                length += len(form)
+                prev = end
+
+    sections = {
+        "tok_verse": _u32(tok_verse),
+        "tok_word": _u32(tok_word),
+        "tok_start": _u32(tok_start),
+        "tok_end": _u32(tok_end),
+        "verse_tok_start": _u32(verse_tok_start),
+    }
+    for profile in PROFILES:
+        offsets, blob = _string_column(forms[profile])
+        sections["tok:" + profile + ".offsets"] = offsets
+        sections["tok:" + profile + ".blob"] = blob
+        sections["tok_pos:" + profile] = _u32(positions[profile])
+
+    # Offline root extraction, one root per token ("" for particles / marks)
+    offsets, blob = _string_column([extract_root(form) for form in forms["full"]])
+    sections["tok_root.offsets"] = offsets
+    sections["tok_root.blob"] = blob
+    return sections
+
+
+def build_snapshot(data, path=SNAPSHOT_FILE):
+    """
+    Write the binary snapshot from the parsed quran.json structure.
+
+    Args:
+        data: list of surahs as published by risan/quran-json
+        path: destination file
+
+    Returns:
+        the corpus version (content hash) written to the file
+    """
+    surah_ids, surah_names, surah_starts = [], [], [0]
+    verse_surah, verse_ayah, texts = [], [], []
+
+    for surah in data:
+        surah_ids.append(surah["id"])
+        surah_names.append(surah["name"])
+        for ayah in surah["verses"]:
+            verse_surah.append(surah["id"])
+            verse_ayah.append(ayah["id"])
+            texts.append(ayah["text"])
+        surah_starts.append(len(texts))
+
+    sections = {
+        "surah_id": _u32(surah_ids),
+        "surah_start": _u32(surah_starts),
+        "verse_surah": _u32(verse_surah),
+        "verse_ayah": _u32(verse_ayah),
+    }
+    columns = [("surah_name", surah_names), ("text", texts)]
+    # Normalization is done once here, one stored column per named profile
+    for profile in PROFILES:
+        columns.append(("norm:" + profile, normalize_many(texts, profile)))
+    for name, strings in columns:
+        offsets, blob = _string_column(strings)
+        sections[name + ".offsets"] = offsets
+        sections[name + ".blob"] = blob
+    sections.update(_token_table(texts))
+
+    digest = hashlib.sha1()
+    for name in sorted(sections):
+        digest.update(name.encode("utf-8"))
+        digest.update(sections[name])
+    corpus_version = digest.hexdigest()[:16]
+
+    # Lay out the sections after the header + table of contents
+    names = sorted(sections)
+    toc = {
+        "corpus_version": corpus_version,
+        "verses": len(texts),
+        "profiles": sorted(PROFILES),
+        "sections": {}
+    }
+    toc_bytes = b""
+    # The TOC length depends on the offsets, so iterate until it is stable
+    while True:
+        offset = HEADER.size + len(toc_bytes)
+        offset += -offset % ALIGN
+        for name in names:
+            toc["sections"][name] = [offset, len(sections[name])]
+            offset += len(sections[name])
+            offset += -offset % ALIGN
+        new_toc = json.dumps(toc, sort_keys=True).encode("utf-8")
+        if new_toc == toc_bytes:
+            break
+        toc_bytes = new_toc
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(toc_bytes)))
+        f.write(toc_bytes)
+        for name in names:
+            start = toc["sections"][name][0]
+            f.write(b"\0" * (start - f.tell()))
+            f.write(sections[name])
+    os.replace(tmp_path, path)
+    return corpus_version
+
+
+# =========================================================
+# SNAPSHOT READER
+# =========================================================
+class Corpus:
+    """Read-only, memory-mapped view over a corpus snapshot"""
+
+    def __init__(self, path=SNAPSHOT_FILE):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.stamp = _stamp(os.fstat(f.fileno()))
+
+        magic, fmt, toc_len = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a corpus snapshot")
+        if fmt != FORMAT_VERSION:
+            raise ValueError(f"{path} has format {fmt}, expected {FORMAT_VERSION} (rebuild it)")
+
+        toc = json.loads(self._mm[HEADER.size:HEADER.size + toc_len].decode("utf-8"))
+        self.version = toc["corpus_version"]
+        self.profiles = toc["profiles"]
+        self._sections = toc["sections"]
+        self._view = memoryview(self._mm)
+
+        self.surah_id = self._array("surah_id")
+        self.surah_start = self._array("surah_start")
+        self.verse_surah = self._array("verse_surah")
+        self.verse_ayah = self._array("verse_ayah")
+        self._surah_pos = {sid: i for i, sid in enumerate(self.surah_id)}
+        self._offsets = {}
+        self._verses = None
+        self._index = None
+        self._tokens = None
+
+    # --- raw sections ---
+    def _section(self, name):
+        start, length = self._sections[name]
+        return self._view[start:start + length]
+
+    def _array(self, name):
+        view = self._section(name)
+        if sys.byteorder != "little":
+            arr = array("I", view.tobytes())
+            arr.byteswap()
+            return arr
+        return view.cast("I")
+
+    def _column_offsets(self, column):
+        offsets = self._offsets.get(column)
+        if offsets is None:
+            offsets = self._offsets[column] = self._array(column + ".offsets")
+        return offsets
+
+    def string(self, column, i):
+        """Decode entry i of a string column"""
+        offsets = self._column_offsets(column)
+        start, _ = self._sections[column + ".blob"]
+        return self._mm[start + offsets[i]:start + offsets[i + 1]].decode("utf-8")
+
+    def strings(self, column):
+        """Decode a whole string column in one pass"""
+        offsets = self._column_offsets(column)
+        blob = bytes(self._section(column + ".blob"))
+        return [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+    # --- verses ---
+    def __len__(self):
+        return len(self.verse_surah)
+
+    def text(self, i):
+        return self.string("text", i)
+
+    def ref(self, i):
+        return f"{self.verse_surah[i]}:{self.verse_ayah[i]}"
+
+    def normalized(self, profile="search"):
+        """Precomputed normalized texts for a named profile (see search.text_normalizer)"""
+        if profile not in self.profiles:
+            raise KeyError(f"Snapshot has no '{profile}' column (rebuild with python corpus.py)")
+        return self.strings("norm:" + profile)
+
+    # --- surahs ---
+    def surah_name(self, surah):
+        return self.string("surah_name", self._surah_pos[surah])
+
+    def surah_range(self, surah):
+        """(start, stop) verse rows of a surah, usable as a slice"""
+        pos = self._surah_pos[surah]
+        return self.surah_start[pos], self.surah_start[pos + 1]
+
+    def surahs(self):
+        """Iterate (surah_id, surah_name, start, stop)"""
+        names = self.strings("surah_name")
+        for pos, sid in enumerate(self.surah_id):
+            yield sid, names[pos], self.surah_start[pos], self.surah_start[pos + 1]
+
+    def verses(self):
+        """
+        The verse list used by the app and the search package:
+        [{"id": "2:255", "surah": 2, "ayah": 255, "text": ..., "normalized": ...}, ...]
+        "normalized" is the stored "search" profile column.
+        Built once per process and shared by every caller.
+        """
+        if self._verses is None:
+            texts = self.strings("text")
+            normalized = self.normalized("search")
+            self._verses = [
+                {
+                    "id": f"{s}:{a}",
+                    "surah": s,
+                    "ayah": a,
+                    "text": texts[i],
+                    "normalized": normalized[i]
+                }
+                for i, (s, a) in enumerate(zip(self.verse_surah, self.verse_ayah))
+            ]
+        return self._verses
+
+    def verse_index(self):
+        """VerseIndex over verses(), built once per process"""
+        if self._index is None:
+            self._index = VerseIndex(self.verses())
+        return self._index
+
+    @property
+    def tokens(self):
+        """Word-level TokenTable, mapped straight from the snapshot"""
+        if self._tokens is None:
+            self._tokens = TokenTable(self)
+        return self._tokens
+
+
+# =========================================================
+# TOKEN TABLE
+# =========================================================
+class TokenTable:
+    """
+    Flat word-level columns built at snapshot time:
+
+        verse[i], word[i]   verse row and word index of token i
+        start[i], end[i]    char offsets of the Uthmani word in the verse text
+        forms(profile)[i]   normalized form of the word (may be "")
+        roots()[i]          root of the word (search.root_matcher.extract_root)
+        positions(profile)[i]  char offset of that form in corpus.normalized(profile)[verse]
+
+    Tokens of verse row r are rows verse_start[r] .. verse_start[r + 1].
+    """
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+        self.verse = corpus._array("tok_verse")
+        self.word = corpus._array("tok_word")
+        self.start = corpus._array("tok_start")
+        self.end = corpus._array("tok_end")
+        self.verse_start = corpus._array("verse_tok_start")
+        self._forms = {}
+        self._uthmani = None
+
+    def __len__(self):
+        return len(self.verse)
+
+    def verse_tokens(self, row):
+        """Token rows of a verse row"""
+        return range(self.verse_start[row], self.verse_start[row + 1])
+
+    def forms(self, profile="lexical"):
+        """Normalized word forms for a named profile, decoded once"""
+        forms = self._forms.get(profile)
+        if forms is None:
+            if profile not in self.corpus.profiles:
+                raise KeyError(f"Snapshot has no '{profile}' tokens (rebuild with python corpus.py)")
+            forms = self._forms[profile] = self.corpus.strings("tok:" + profile)
+        return forms
+
+    def positions(self, profile="lexical"):
+        return self.corpus._array("tok_pos:" + profile)
+
+    def roots(self):
+        """Triliteral root of every token, extracted when the snapshot was built"""
+        if "root" not in self._forms:
+            self._forms["root"] = self.corpus.strings("tok_root")
+        return self._forms["root"]
+
+    def uthmani_forms(self):
+        """Uthmani word of every token, sliced from the verse texts once"""
+        if self._uthmani is None:
+            texts = self.corpus.strings("text")
+            self._uthmani = [
+                texts[v][s:e] for v, s, e in zip(self.verse, self.start, self.end)
+            ]
+        return self._uthmani
+
+
+# =========================================================
+# VERSE INDEX
+# =========================================================
+class VerseIndex:
+    """
+    Constant-time lookup by "surah:ayah" over an ordered verse list.
+
+    Verses of a surah are contiguous in corpus order, so each surah is a
+    (start, stop) range and neighbour windows are plain list slices.
+    """
+
+    def __init__(self, verses):
+        self.verses = verses
+        self._pos = {}
+        self._surah = {}
+        for i, v in enumerate(verses):
+            self._pos[v["id"]] = i
+            start, _ = self._surah.get(v["surah"], (i, i))
+            self._surah[v["surah"]] = (start, i + 1)
+
+    def __len__(self):
+        return len(self.verses)
+
+    def __contains__(self, ref):
+        return ref in self._pos
+
+    def position(self, ref):
+        """Row of a verse in the list, or None"""
+        return self._pos.get(ref)
+
+    def get(self, ref):
+        """Verse dict for "surah:ayah", or None"""
+        i = self._pos.get(ref)
+        return self.verses[i] if i is not None else None
+
+    def surah_range(self, surah):
+        """(start, stop) rows of a surah, (0, 0) if unknown"""
+        return self._surah.get(surah, (0, 0))
+
+    def surah_verses(self, surah):
+        start, stop = self.surah_range(surah)
+        return self.verses[start:stop]
+
+    def window(self, ref, before=2, after=2):
+        """
+        Neighbours of a verse inside its own surah.
+
+        Returns:
+            (before_list, target, after_list); target is None for unknown refs
+        """
+        i = self._pos.get(ref)
+        if i is None:
+            return [], None, []
+        start, stop = self._surah[self.verses[i]["surah"]]
+        return (
+            self.verses[max(start, i - before):i],
+            self.verses[i],
+            self.verses[i + 1:min(stop, i + after + 1)]
+        )
+
+
+def _stamp(st):
+    # build_snapshot replaces the file (new inode), so this changes on every rebuild
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def snapshot_stamp(path):
+    """Identity of the file currently at path (None if there is none)"""
+    try:
+        return _stamp(os.stat(path))
+    except OSError:
+        return None
+
+
+def snapshot_is_current(path):
+    """True when path holds a snapshot in this module's FORMAT_VERSION"""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+    except OSError:
+        return False
+    if len(header) < HEADER.size:
+        return False
+    magic, fmt, _ = HEADER.unpack(header)
+    return magic == MAGIC and fmt == FORMAT_VERSION
+
+
+_OPEN = {}
+_OPEN_LOCK = threading.Lock()
+
+def load_corpus(path=SNAPSHOT_FILE):
+    """
+    Open (and if needed build or rebuild) the corpus snapshot.
+    The mapped corpus is shared by every module and thread in the process;
+    when the file is replaced (python corpus.py) the next call maps the new
+    one, and holders of the old Corpus keep a valid mapping.
+    """
+    corpus = _OPEN.get(path)
+    if corpus is None or corpus.stamp != snapshot_stamp(path):
+        with _OPEN_LOCK:
+            corpus = _OPEN.get(path)
+            if corpus is None or corpus.stamp != snapshot_stamp(path):
+                # Missing, or written by an older build of this module: rebuild
+                if not snapshot_is_current(path):
+                    build_snapshot(fetch_source(), path)
+                corpus = _OPEN[path] = Corpus(path)
+    return corpus
+
+
+# =========================================================
+# ENTRY POINT
+# =========================================================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the Quran corpus snapshot")
+    parser.add_argument("--source", help="Local quran.json (risan/quran-json format) instead of downloading")
+    parser.add_argument("--output", default=SNAPSHOT_FILE, help="Snapshot path")
+    args = parser.parse_args()
+
+    if args.source:
+        with open(args.source, encoding="utf-8") as f:
+            source = json.load(f)
+    else:
+        print("📥 Downloading Quran text...")
+        source = fetch_source()
+
+    version = build_snapshot(source, args.output)
+    corpus = Corpus(args.output)
+    print(f"✅ Snapshot {version}: {len(corpus)} verses → {args.output}")
@@ -0,0 +1,235 @@
+"""
+Embedding Cache - ذاكرة دائمة للمتجهات
+
+Content-addressed store of sentence embeddings on disk (SQLite), keyed by
+(model name, sha1 of the canonical text). Every encoder wrapper (ai_engine,
+quran_analyzer_v2, backend_builder, app) goes through CachedEncoder, so a
+rerun after tweaking a threshold re-reads vectors instead of re-running the
+model. The store is bounded: past MAX_ENTRIES the least recently used rows
+are evicted (hit timestamps are kept in memory and written in batches, so
+a read never writes). Query vectors additionally go through an in-process LRU
+(encode_query).
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+
+import numpy as np
+
+from search.query_cache import QueryCache
+
+# =========================================================
+# CONFIGURATION
+# =========================================================
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_cache.sqlite")
+MAX_ENTRIES = 250_000
+EVICT_TO = 0.9  # after eviction the store holds MAX_ENTRIES * EVICT_TO rows
+SQL_CHUNK = 500  # keys per SELECT (SQLite parameter limit)
+TOUCH_BATCH = 2000  # pending hit timestamps written in one transaction
+# encode() options that change what the model returns: the cache holds the
+# plain float32 sentence vectors only
+UNCACHEABLE_OPTIONS = frozenset({"output_value", "precision", "prompt", "prompt_name", "truncate_dim"})
+
+
+def canonical(text):
+    """What the model effectively sees: NFC, whitespace collapsed"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_key(text):
+    return hashlib.sha1(canonical(text).encode("utf-8")).digest()
+
+
+# =========================================================
+# STORE
+# =========================================================
+class EmbeddingCache:
+    def __init__(self, path=CACHE_FILE, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, key BLOB NOT NULL, vec BLOB NOT NULL,"
+            " used INTEGER NOT NULL, PRIMARY KEY (model, key))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings (used)")
+        self._db.commit()
+        row = self._db.execute("SELECT MAX(used) FROM embeddings").fetchone()
+        self._clock = row[0] or 0
+        # (model, key) -> clock of the last hit, not yet written: reads stay
+        # read-only and the LRU timestamps go out with the next write
+        self._touched = {}
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model, texts):
+        """One float32 vector (or None when absent) per text"""
+        keys = [text_key(t) for t in texts]
+        found = {}
+        with self._lock:
+            self._clock += 1
+            for i in range(0, len(keys), SQL_CHUNK):
+                chunk = keys[i:i + SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                found.update(self._db.execute(
+                    f"SELECT key, vec FROM embeddings WHERE model = ? AND key IN ({marks})",
+                    [model, *chunk],
+                ))
+            for k in found:
+                self._touched[model, k] = self._clock
+            if len(self._touched) >= TOUCH_BATCH:
+                self._write_touched()
+                self._db.commit()
+        return [
+            np.frombuffer(found[k], dtype=np.float32) if k in found else None
+            for k in keys
+        ]
+
+    def put_many(self, model, texts, vectors):
+        rows = [
+            (model, text_key(t), np.asarray(v, dtype=np.float32).tobytes())
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._clock += 1
+            self._write_touched()
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, key, vec, used) VALUES (?, ?, ?, ?)",
+                [(*row, self._clock) for row in rows],
+            )
+            self._evict()
+            self._db.commit()
+
+    def _write_touched(self):
+        if self._touched:
+            self._db.executemany(
+                "UPDATE embeddings SET used = ? WHERE model = ? AND key = ?",
+                [(clock, model, key) for (model, key), clock in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self):
+        count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * EVICT_TO)
+        self._db.execute(
+            "DELETE FROM embeddings WHERE rowid IN"
+            " (SELECT rowid FROM embeddings ORDER BY used LIMIT ?)",
+            (excess,),
+        )
+
+    def clear(self, model=None):
+        with self._lock:
+            self._write_touched()
+            if model is None:
+                self._db.execute("DELETE FROM embeddings")
+            else:
+                self._db.execute("DELETE FROM embeddings WHERE model = ?", (model,))
+            self._db.commit()
+
+
+_DEFAULT = None
+_DEFAULT_LOCK = threading.Lock()
+
+def default_cache():
+    """Process-wide cache at CACHE_FILE, opened on first use"""
+    global _DEFAULT
+    if _DEFAULT is None:
+        with _DEFAULT_LOCK:
+            if _DEFAULT is None:
+                _DEFAULT = EmbeddingCache()
+    return _DEFAULT
+
+
+# =========================================================
+# ENCODER WRAPPER
+# =========================================================
+class CachedEncoder:
+    """
+    Drop-in front of a SentenceTransformer: encode() serves cached rows and
+    sends only the misses to the model, in one batch. Any other attribute
+    (similarity, max_seq_length, ...) is the wrapped model's.
+    """
+
+    def __init__(self, model, model_name, cache=None):
+        self.model = model
+        self.model_name = model_name
+        self.cache = cache if cache is not None else default_cache()
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=False,
+               convert_to_tensor=False, convert_to_numpy=True, **kwargs):
+        """
+        SentenceTransformer.encode over the cache. The cache stores the raw
+        vectors: normalize_embeddings and convert_to_tensor are applied to
+        the result here; other options (show_progress_bar, device, ...) go
+        to the model for the misses. Options that change the vectors
+        themselves (UNCACHEABLE_OPTIONS) raise TypeError.
+        """
+        unsupported = UNCACHEABLE_OPTIONS.intersection(kwargs)
+        if unsupported:
+            raise TypeError(f"CachedEncoder.encode does not support {', '.join(sorted(unsupported))}")
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        vectors = self.cache.get_many(self.model_name, texts)
+
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            # Duplicates inside one call are encoded once
+            todo = list(dict.fromkeys(canonical(texts[i]) for i in missing))
+            fresh = np.asarray(
+                self.model.encode(todo, batch_size=batch_size, convert_to_numpy=True, **kwargs),
+                dtype=np.float32,
+            )
+            self.cache.put_many(self.model_name, todo, fresh)
+            by_text = dict(zip(todo, fresh))
+            for i in missing:
+                vectors[i] = by_text[canonical(texts[i])]
+
+        out = np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(out):
+            out = out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        if convert_to_tensor:
+            import torch
+            out = torch.from_numpy(out)
+        return out[0] if single else out
+
+
+# =========================================================
+# QUERY VECTORS (in-process)
+# =========================================================
+QUERY_VECTOR_CACHE_SIZE = 1024
+
+# Shared by every Streamlit session; hits are model calls avoided
+QUERY_VECTORS = QueryCache(maxsize=QUERY_VECTOR_CACHE_SIZE)
+
+
+def encode_query(model, query, cache=QUERY_VECTORS):
+    """
+    model.encode(query) through an in-process LRU keyed by (model, canonical
+    query), so reruns and repeated queries skip both the model and SQLite.
+    """
+    text = canonical(query)
+    if cache is None:
+        return model.encode(text)
+    model_name = getattr(model, "model_name", type(model).__name__)
+    # The model is part of the key, not the cache version: a version change
+    # empties the whole LRU, and two encoders (torch / onnx) may alternate
+    return cache.get_or_compute((model_name, text), None, lambda: _frozen(model.encode(text)))
+
+
+def _frozen(vec):
+    # Cached vectors are shared between sessions: make in-place edits fail loudly
+    vec = np.array(vec, dtype=np.float32)
+    vec.setflags(write=False)
+    return vec
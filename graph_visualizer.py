@@ -4,9 +4,13 @@ import streamlit as st
 import streamlit.components.v1 as components
 import re
 
-def generate_root_network(quran_data, target_root):
+from search.root_matcher import query_root, root_index
+
+def generate_root_network(corpus, target_root):
     """
     يبني شبكة تفاعلية تربط الجذر بجميع الكلمات المشتقة منه في القرآن
+    corpus: the loaded snapshot (corpus.load_corpus()); words come from its
+    precomputed token table, so the Uthmani and normalized forms are aligned.
     """
     # 1. إنشاء الجراف (الشبكة)
     G = nx.Graph()
@@ -23,36 +27,28 @@ def generate_root_network(quran_data, target_root):
         else:
             return "<div>⚠️ يرجى إدخال جذر ثلاثي صحيح (3 حروف).</div>"
 
-    l1, l2, l3 = list(target_root)
-    
     # النود المركزية (الجذر)
     G.add_node(target_root, label=f"الجذر: {target_root}", color="#ff4b4b", size=40, title="أصل المادة")
     
-    # نمط البحث
-    pattern = fr"\w*{l1}\w*{l2}\w*{l3}\w*"
-    
-    # 2. البحث عن العلاقات
+    # 2. البحث عن العلاقات (فهرس الجذور المحسوب مسبقاً: جذر -> مواضع الكلمات)
+    tokens = corpus.tokens
+    original_words = tokens.uthmani_forms()
     word_counts = {}
     
-    for ayah in quran_data:
-        # البحث عن الكلمات في الآية
-        words = ayah['normalized'].split()
-        original_words = ayah['uthmani'].split()
+    for i in root_index(corpus).tokens(query_root(target_root)):
+        # الكلمة الأصلية (بالرسم العثماني)
+        matched_word = original_words[i]
+        ref = corpus.ref(tokens.verse[i])
         
-        for i, word in enumerate(words):
-            if re.search(pattern, word):
-                # الكلمة الأصلية (بالرسم العثماني)
-                matched_word = original_words[i]
-                
-                # تجميع التكرارات (لجعل حجم النود أكبر حسب التكرار)
-                if matched_word in word_counts:
-                    word_counts[matched_word]['count'] += 1
-                    word_counts[matched_word]['ayahs'].append(ayah['ref'])
-                else:
-                    word_counts[matched_word] = {
-                        'count': 1,
-                        'ayahs': [ayah['ref']]
-                    }
+        # تجميع التكرارات (لجعل حجم النود أكبر حسب التكرار)
+        if matched_word in word_counts:
+            word_counts[matched_word]['count'] += 1
+            word_counts[matched_word]['ayahs'].append(ref)
+        else:
+            word_counts[matched_word] = {
+                'count': 1,
+                'ayahs': [ref]
+            }
 
     # 3. إضافة نودات الكلمات وربطها بالجذر
     for word, data in word_counts.items():
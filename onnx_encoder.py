@@ -0,0 +1,221 @@
+"""
+ONNX Encoder - ترميز سريع على المعالج
+
+Optional backend for paraphrase-multilingual-MiniLM-L12-v2: the transformer
+is exported once to ONNX, its weights dynamically quantized to int8, and
+queries then run through onnxruntime on CPU (tokenizer + one session call +
+mean pooling) instead of a PyTorch forward pass. encode() mirrors
+SentenceTransformer.encode, so CachedEncoder, encode_query and the batch
+builders work unchanged.
+
+    python onnx_encoder.py            # export + quantize into onnx_models/
+    ENCODER_BACKEND=onnx streamlit run app.py
+
+Runtime needs onnxruntime + tokenizers only; the export also needs
+sentence-transformers (torch). Compare speed / parity with bench_encoder.py.
+"""
+
+import importlib.util
+import json
+import os
+
+import numpy as np
+
+from embedding_cache import CachedEncoder
+
+# =========================================================
+# CONFIGURATION
+# =========================================================
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx_models")
+QUANTIZED_FILE = "model.int8.onnx"
+BACKENDS = ("torch", "onnx")
+# "torch" (SentenceTransformer) or "onnx" (int8 onnxruntime)
+ENCODER_BACKEND = os.environ.get("ENCODER_BACKEND", "torch")
+
+
+def model_dir(model_name=MODEL_NAME):
+    return os.path.join(MODELS_DIR, model_name.rsplit("/", 1)[-1])
+
+
+def cache_name(model_name, backend):
+    """Embedding-cache key: int8 vectors are close to, not equal to, the torch ones"""
+    return model_name if backend == "torch" else f"{model_name}#onnx-int8"
+
+
+# =========================================================
+# EXPORT (one-off, needs torch)
+# =========================================================
+def export(model_name=MODEL_NAME, out_dir=None, opset=14):
+    """Export the transformer to ONNX and write its int8 copy; returns out_dir"""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    out_dir = out_dir or model_dir(model_name)
+    os.makedirs(out_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    st_model.tokenizer.save_pretrained(out_dir)  # tokenizer.json for the runtime
+
+    class Hidden(torch.nn.Module):
+        # The pooling stays in NumPy: export only the token states
+        def __init__(self, transformer):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, input_ids, attention_mask):
+            return self.transformer(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+    sample = st_model.tokenizer(["بسم الله الرحمن الرحيم"], return_tensors="pt")
+    fp32 = os.path.join(out_dir, "model.onnx")
+    axes = {0: "batch", 1: "tokens"}
+    torch.onnx.export(
+        Hidden(st_model[0].auto_model.eval()),
+        (sample["input_ids"], sample["attention_mask"]),
+        fp32,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["token_embeddings"],
+        dynamic_axes={"input_ids": axes, "attention_mask": axes, "token_embeddings": axes},
+        opset_version=opset,
+    )
+    quantize_dynamic(fp32, os.path.join(out_dir, QUANTIZED_FILE), weight_type=QuantType.QInt8)
+    os.remove(fp32)
+
+    with open(os.path.join(out_dir, "encoder.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "model": model_name,
+            "max_seq_length": st_model.max_seq_length,
+            "pad_token": st_model.tokenizer.pad_token,
+        }, f)
+    return out_dir
+
+
+# =========================================================
+# RUNTIME
+# =========================================================
+class OnnxEncoder:
+    """SentenceTransformer-compatible encode() over the int8 ONNX export"""
+
+    def __init__(self, path=None, threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        path = path or model_dir()
+        with open(os.path.join(path, "encoder.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.model_name = meta["model"]
+        self.max_seq_length = meta["max_seq_length"]
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.max_seq_length)
+        pad = meta["pad_token"]
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad), pad_token=pad)
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(path, QUANTIZED_FILE), options, providers=["CPUExecutionProvider"]
+        )
+
+    def _forward(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        states = self.session.run(None, {"input_ids": ids, "attention_mask": mask})[0]
+        # Mean pooling over the real tokens (the model's Pooling module)
+        weights = mask[:, :, None].astype(np.float32)
+        return (states * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        out = np.zeros((len(texts), 0), dtype=np.float32)
+        if texts:
+            # Length-sorted batches pad less (same trick as SentenceTransformer)
+            order = np.argsort([-len(t) for t in texts], kind="stable")
+            chunks = [
+                self._forward([texts[i] for i in order[start:start + batch_size]])
+                for start in range(0, len(texts), batch_size)
+            ]
+            out = np.empty((len(texts), chunks[0].shape[1]), dtype=np.float32)
+            out[order] = np.concatenate(chunks)
+        return out[0] if single else out
+
+
+def resolve_backend(backend=None):
+    """The backend that will actually run: "onnx" needs onnxruntime + tokenizers"""
+    backend = backend or ENCODER_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown encoder backend: {backend}")
+    if backend == "onnx":
+        missing = [m for m in ("onnxruntime", "tokenizers") if importlib.util.find_spec(m) is None]
+        if missing:
+            print(f"⚠️ ONNX backend unavailable ({', '.join(missing)} not installed); using PyTorch")
+            return "torch"
+    return backend
+
+
+def ensure_exported(model_name=MODEL_NAME):
+    """Directory of the int8 export, exporting it on first use"""
+    path = model_dir(model_name)
+    if not os.path.exists(os.path.join(path, QUANTIZED_FILE)):
+        print(f"⏳ Exporting {model_name} to int8 ONNX (one-off)...")
+        export(model_name, path)
+    return path
+
+
+def build_model(model_name=MODEL_NAME, backend="torch", threads=None):
+    """The bare encoder (no cache) for a resolved backend; threads caps intra-op threads"""
+    if backend == "onnx":
+        return OnnxEncoder(ensure_exported(model_name), threads)
+
+    from sentence_transformers import SentenceTransformer
+
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    return SentenceTransformer(model_name)
+
+
+def query_backend(backend=None, vectors_backend=None):
+    """
+    The backend for query vectors compared against stored vectors built on
+    vectors_backend. The int8 / torch parity is not measured yet
+    (test_onnx_encoder.py, bench_encoder.py), so mixing the two is refused:
+    the stored vectors' backend is used instead, with a warning.
+    """
+    backend = resolve_backend(backend)
+    if vectors_backend is not None and backend != vectors_backend:
+        print(
+            f"⚠️ Stored vectors were built with the {vectors_backend} encoder; "
+            f"{backend} query vectors are not comparable with them. Using {vectors_backend}"
+        )
+        return resolve_backend(vectors_backend)
+    return backend
+
+
+def load_encoder(model_name=MODEL_NAME, backend=None, vectors_backend=None):
+    """
+    The sentence encoder behind the persistent embedding cache, on the chosen
+    backend (default ENCODER_BACKEND). "onnx" exports the model on first use
+    and falls back to torch when onnxruntime is not installed. Pass
+    vectors_backend when the queries are searched against stored vectors
+    (see query_backend).
+    """
+    backend = query_backend(backend, vectors_backend)
+    return CachedEncoder(build_model(model_name, backend), cache_name(model_name, backend))
+
+
+# =========================================================
+# ENTRY POINT
+# =========================================================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the encoder to int8 ONNX")
+    parser.add_argument("--model", default=MODEL_NAME, help="SentenceTransformer model")
+    parser.add_argument("--out", help="Output directory (default: onnx_models/<model>)")
+    args = parser.parse_args()
+
+    print(f"✅ int8 ONNX encoder → {export(args.model, args.out)}")
@@ -0,0 +1,125 @@
+"""
+Reduced-precision vector storage - تخزين مضغوط للمتجهات
+
+Topic and verse vectors stored as float16 (half the memory) or int8 with
+one float32 scale per vector (a quarter of the memory), plus scoring
+kernels that read the compact form directly: rows are widened chunk by
+chunk during the dot product, so a full float32 copy never exists.
+
+    compact = compress(matrix, "int8")
+    compact.save("quran_topic_vectors_v2.int8.npz")
+    scores = CompactVectors.load(path).scores(q_vec)
+
+Measure memory / latency / recall against float32 with bench_quantization.py.
+"""
+
+import numpy as np
+
+from search.vector_index import top_k
+
+FORMATS = ("float32", "float16", "int8")
+CHUNK_ROWS = 4096  # rows widened to float32 at a time while scoring
+
+# float32 value of every float16 bit pattern (256 KiB)
+_FLOAT16_TO_32 = np.arange(1 << 16, dtype=np.uint16).view(np.float16).astype(np.float32)
+
+
+class CompactVectors:
+    def __init__(self, fmt, data, scale=None, version=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown vector format: {fmt}")
+        self.fmt = fmt
+        self.data = data
+        self.scale = scale  # int8 only: (n,) float32, row = data * scale
+        self.version = version  # what the vectors were built from (corpus version, ...)
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    @property
+    def dim(self):
+        return self.data.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def scores(self, q_vec):
+        """Dot product of q_vec with every stored row, as float32"""
+        return self.scores_many(np.asarray(q_vec, dtype=np.float32)[None, :])[0]
+
+    def scores_many(self, queries):
+        """(len(queries), n) dot products; each chunk is widened once for all queries"""
+        qt = np.asarray(queries, dtype=np.float32).T
+        if self.fmt == "float32":
+            return (self.data @ qt).T
+
+        out = np.empty((len(self), qt.shape[1]), dtype=np.float32)
+        buf = np.empty((min(CHUNK_ROWS, len(self)), self.dim), dtype=np.float32)
+        for start in range(0, len(self), CHUNK_ROWS):
+            block = self.data[start:start + CHUNK_ROWS]
+            wide = buf[:len(block)]
+            if self.fmt == "float16":
+                # Table lookup on the raw bits beats astype() for the widening
+                np.take(_FLOAT16_TO_32, block.view(np.uint16), out=wide)
+            else:
+                wide[...] = block
+            np.matmul(wide, qt, out=out[start:start + len(block)])
+        if self.scale is not None:
+            out *= self.scale[:, None]
+        return out.T
+
+    def top_k(self, q_vec, k=5):
+        """(rows, scores) of the k best dot products, best first"""
+        rows, scores = self.top_k_many(np.asarray(q_vec, dtype=np.float32)[None, :], k)
+        return rows[0], scores[0]
+
+    def top_k_many(self, queries, k=5):
+        """(rows, scores), each (len(queries), k), best first per query"""
+        return top_k(self.scores_many(queries), k)
+
+    def to_float32(self):
+        out = self.data.astype(np.float32)
+        if self.scale is not None:
+            out *= self.scale[:, None]
+        return out
+
+    # --- persistence ---
+    def save(self, path):
+        arrays = {"data": self.data, "fmt": np.array(self.fmt)}
+        if self.scale is not None:
+            arrays["scale"] = self.scale
+        if self.version is not None:
+            arrays["version"] = np.array(self.version)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(
+                str(f["fmt"]), f["data"],
+                f["scale"] if "scale" in f.files else None,
+                str(f["version"]) if "version" in f.files else None,
+            )
+
+
+def compress(matrix, fmt, version=None):
+    """CompactVectors of a (n, dim) float matrix in the given format"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if fmt == "float32":
+        return CompactVectors(fmt, matrix.copy(), version=version)
+    if fmt == "float16":
+        return CompactVectors(fmt, matrix.astype(np.float16), version=version)
+    if fmt == "int8":
+        # Symmetric per-vector scale: the largest |component| maps to 127
+        scale = np.abs(matrix).max(axis=1) / 127.0
+        scale[scale == 0] = 1.0
+        data = np.round(matrix / scale[:, None]).astype(np.int8)
+        return CompactVectors(fmt, data, scale.astype(np.float32), version=version)
+    raise ValueError(f"unknown vector format: {fmt}")
+
+
+def compact_path(path, fmt):
+    """foo.pkl / foo.npy -> foo.<fmt>.npz next to it"""
+    base = path.rsplit(".", 1)[0] if "." in path.rsplit("/", 1)[-1] else path
+    return f"{base}.{fmt}.npz"
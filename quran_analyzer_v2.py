@@ -1,11 +1,12 @@
-import requests
 import json
 import numpy as np
 import pickle
-import re
-from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 from collections import defaultdict
+from corpus import load_corpus
+from onnx_encoder import BACKENDS, load_encoder, resolve_backend
+from quantization import compact_path, compress
+from search.text_normalizer import normalize_semantic
 
 # =========================================================
 # 1. CONFIG
@@ -14,35 +15,33 @@ from collections import defaultdict
 MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
 SIM_THRESHOLD_CONTINUITY = 0.78     # same topic (ayah n → n+1)
 SIM_THRESHOLD_GLOBAL = 0.82         # same topic across surahs
+BATCH_SIZE = 64                     # verses per forward pass when encoding
 
 # =========================================================
 # 2. TEXT NORMALIZATION (semantic-safe)
 # =========================================================
 
-def normalize_text(text):
-    text = re.sub(r'[\u064B-\u065F\u0670\u06D6-\u06ED]', '', text)
-    text = text.replace("ٱ", "ا").replace("إ", "ا").replace("أ", "ا").replace("آ", "ا")
-    text = text.replace("ة", "ه").replace("ى", "ي")
-    return text.strip()
+# Shared "semantic" profile, precomputed in the corpus snapshot
+normalize_text = normalize_semantic
 
 # =========================================================
 # 3. LOAD QURAN (NO INTERPRETATION)
 # =========================================================
 
 def load_quran():
-    url = "https://raw.githubusercontent.com/risan/quran-json/main/dist/quran.json"
-    data = requests.get(url).json()
+    corpus = load_corpus()
+    texts = corpus.strings("text")
+    clean = corpus.normalized("semantic")
 
     quran = {}
-    for surah in data:
-        surah_name = surah["name"]
+    for surah_id, surah_name, start, stop in corpus.surahs():
         verses = []
-        for ayah in surah["verses"]:
+        for i in range(start, stop):
             verses.append({
-                "ayah": ayah["id"],
-                "text": ayah["text"],
-                "clean": normalize_text(ayah["text"]),
-                "ref": f"{surah['id']}:{ayah['id']}"
+                "ayah": corpus.verse_ayah[i],
+                "text": texts[i],
+                "clean": clean[i],
+                "ref": f"{surah_id}:{corpus.verse_ayah[i]}"
             })
         quran[surah_name] = verses
     return quran
@@ -52,12 +51,18 @@ def load_quran():
 # =========================================================
 
 class Embedder:
-    def __init__(self):
-        self.model = SentenceTransformer(MODEL_NAME)
+    def __init__(self, backend=None):
+        # Disk cache in front of the model: reruns re-read known vectors.
+        # backend: "torch" / "onnx" (default ENCODER_BACKEND, see onnx_encoder.py)
+        self.model = load_encoder(MODEL_NAME, backend)
 
     def encode(self, text):
         return self.model.encode(text)
 
+    def encode_many(self, texts, batch_size=BATCH_SIZE):
+        # One batched pass instead of one forward pass per ayah
+        return self.model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True)
+
 # =========================================================
 # 5. CONTINUITY DECISION (ayah → ayah)
 # =========================================================
@@ -70,12 +75,15 @@ def same_topic(vec1, vec2, threshold):
 # 6. SURAH ANALYSIS (SEQUENTIAL ONLY)
 # =========================================================
 
-def analyze_surah(surah_name, verses, embedder):
+def analyze_surah(surah_name, verses, embedder, vectors=None):
+    """vectors: precomputed rows for `verses` (else the surah is encoded in one batch)"""
+    if vectors is None:
+        vectors = embedder.encode_many([v["clean"] for v in verses])
+
     topics = []
     current_topic = None
 
-    for v in verses:
-        vec = embedder.encode(v["clean"])
+    for v, vec in zip(verses, vectors):
 
         if current_topic is None:
             current_topic = {
@@ -145,17 +153,36 @@ def build_cross_references(topics):
 # 9. MAIN PIPELINE
 # =========================================================
 
-def run():
+def run(batch_size=BATCH_SIZE, precision=None, processes=None, backend=None):
+    """
+    processes: encode over a pool of that many worker processes (0 = every core)
+    backend: encoder backend, "torch" or "onnx" (default ENCODER_BACKEND)
+    """
     print("📥 Loading Quran...")
     quran = load_quran()
-
-    print("🧠 Loading model...")
-    embedder = Embedder()
+    # Whole corpus in one batched call: batches are never cut short at surah ends
+    all_verses = [v for verses in quran.values() for v in verses]
+    texts = [v["clean"] for v in all_verses]
+
+    if processes is not None:
+        from ai_engine import encode_corpus
+
+        print(f"🔢 Encoding all verses on {processes or 'all'} processes (batch size {batch_size})...")
+        embedder = None  # the workers hold the model; analyze_surah gets the vectors
+        vectors = encode_corpus(texts, processes or None, batch_size, MODEL_NAME, backend=backend)
+    else:
+        print("🧠 Loading model...")
+        embedder = Embedder(backend)
+        print(f"🔢 Encoding all verses (batch size {batch_size})...")
+        vectors = embedder.encode_many(texts, batch_size=batch_size)
 
     print("⚙️ Sequential analysis...")
     local_topics = []
+    start = 0
     for surah, verses in quran.items():
-        local_topics.extend(analyze_surah(surah, verses, embedder))
+        stop = start + len(verses)
+        local_topics.extend(analyze_surah(surah, verses, embedder, vectors[start:stop]))
+        start = stop
 
     print(f"📌 Local topics: {len(local_topics)}")
 
@@ -179,7 +206,9 @@ def run():
             }
             for i, t in enumerate(unified_topics)
         ],
-        "ayah_index": dict(ayah_topic_map)
+        "ayah_index": dict(ayah_topic_map),
+        # Encoder backend of quran_topic_vectors_v2.pkl: the app encodes queries on the same one
+        "backend": resolve_backend(backend),
     }
 
     with open("quran_topics_v2.json", "w", encoding="utf-8") as f:
@@ -188,12 +217,28 @@ def run():
     with open("quran_topic_vectors_v2.pkl", "wb") as f:
         pickle.dump([t["vector"] for t in unified_topics], f)
 
+    if precision:
+        # Compact copy (float16 / int8 per-vector scale), see quantization.py
+        compact_file = compact_path("quran_topic_vectors_v2.pkl", precision)
+        compress([t["vector"] for t in unified_topics], precision).save(compact_file)
+
     print("✅ Version 2 complete.")
     print("📁 Files generated:")
     print("   - quran_topics_v2.json")
     print("   - quran_topic_vectors_v2.pkl")
+    if precision:
+        print(f"   - {compact_file}")
 
 # =========================================================
 
 if __name__ == "__main__":
-    run()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the v2 Quran topic map")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Verses per encoding batch")
+    parser.add_argument("--precision", choices=["float16", "int8"], help="Also save compact topic vectors")
+    parser.add_argument("--processes", type=int, help="Encode on a process pool (0 = every core)")
+    parser.add_argument("--backend", choices=BACKENDS, help="Encoder backend (default: ENCODER_BACKEND or torch)")
+    args = parser.parse_args()
+
+    run(batch_size=args.batch_size, precision=args.precision, processes=args.processes, backend=args.backend)
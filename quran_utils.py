@@ -1,43 +1,71 @@
-import requests
 import re
-import streamlit as st
 import random
+import threading
 import json
 import os
+from corpus import load_corpus
+from search.text_normalizer import normalize_lexical as normalize_text
+from search.text_normalizer import normalize
+from search.index import SearchIndex
+from search.multi_matcher import matcher
 
 # ==========================================
 # 1. تحميل ومعالجة البيانات (Core)
 # ==========================================
 
-def normalize_text(text):
-    text = re.sub(r'[\u064B-\u065F\u0670\u06D6-\u06ED\u06E5\u06E6]', '', text)
-    text = re.sub(r'[أإآ]', 'ا', text)
-    text = text.replace('ة', 'ه') # توحيد التاء المربوطة والهاء
-    return text
-
-@st.cache_resource
 def load_quran_db():
-    url = "https://raw.githubusercontent.com/risan/quran-json/main/dist/quran.json"
     try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            quran_list = []
-            for surah in data:
-                s_name = surah['name']
-                s_id = surah['id']
-                for ayah in surah['verses']:
-                    quran_list.append({
-                        "ref": f"{s_name} ({s_id}:{ayah['id']})",
-                        "uthmani": ayah['text'],
-                        "normalized": normalize_text(ayah['text'])
-                    })
-            return quran_list
-        return None
+        corpus = load_corpus()
+        texts = corpus.strings("text")
+        normalized = corpus.normalized("lexical")
+        quran_list = []
+        for s_id, s_name, start, stop in corpus.surahs():
+            for i in range(start, stop):
+                quran_list.append({
+                    "ref": f"{s_name} ({s_id}:{corpus.verse_ayah[i]})",
+                    "uthmani": texts[i],
+                    "normalized": normalized[i]
+                })
+        return quran_list
     except:
         return None
 
-QURAN_DATA = load_quran_db()
+_QURAN_DATA = None
+_QURAN_LOCK = threading.Lock()
+
+def get_quran_data():
+    """
+    القرآن محمّل بشكل كسول: لا شيء يُحمّل عند الاستيراد، وأول من يطلب البيانات يدفع ثمن التحميل.
+    Thread-safe and independent of Streamlit, so CLI tools and tests import instantly.
+    Returns None if the corpus could not be loaded (a later call retries).
+    """
+    global _QURAN_DATA
+    if _QURAN_DATA is None:
+        with _QURAN_LOCK:
+            if _QURAN_DATA is None:
+                _QURAN_DATA = load_quran_db()
+    return _QURAN_DATA
+
+_SEARCH_INDEX = None
+
+def get_search_index():
+    """
+    فهرس البحث المشترك (مصفوفة اللواحق وفهرس الجذور) - يُبنى أو يُحمّل عند أول استخدام فقط.
+    Counts and positions of any substring in logarithmic time.
+    """
+    global _SEARCH_INDEX
+    corpus = load_corpus()  # remaps the snapshot when the file was rebuilt
+    if _SEARCH_INDEX is None or _SEARCH_INDEX.version != corpus.version:
+        with _QURAN_LOCK:
+            if _SEARCH_INDEX is None or _SEARCH_INDEX.version != corpus.version:
+                _SEARCH_INDEX = SearchIndex.from_corpus(corpus)
+    return _SEARCH_INDEX
+
+def __getattr__(name):
+    # Backward compatibility: quran_utils.QURAN_DATA is resolved on first access
+    if name == "QURAN_DATA":
+        return get_quran_data()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ==========================================
 # 2. نظام الفهرسة الحية (Live Indexing System)
@@ -71,7 +99,8 @@ def live_indexer_agent(model, topic_keyword, status_callback=None):
     """
     العميل المفهرس: يبحث في القرآن، يقسم الآيات لمواضيع، ويحفظها
     """
-    if not QURAN_DATA:
+    quran = get_quran_data()
+    if not quran:
         if status_callback: status_callback("⚠️ قاعدة البيانات غير جاهزة.")
         return None
 
@@ -91,17 +120,10 @@ def live_indexer_agent(model, topic_keyword, status_callback=None):
     print(f"Searching for keywords: {keywords}")
     if status_callback: status_callback(f"🗝️ الكلمات المفتاحية: {keywords}")
 
-    raw_verses = []
-    for ayah in QURAN_DATA:
-        # البحث عن أي من الكلمات المفتاحية
-        match = False
-        for kw in keywords:
-            if kw in ayah["normalized"]:
-                match = True
-                break
-        
-        if match:
-            raw_verses.append(f"{ayah['ref']}: {ayah['uthmani']}")
+    # البحث عن كل الكلمات المفتاحية دفعة واحدة (Aho-Corasick)
+    hits = matcher(keywords).rows([ayah["normalized"] for ayah in quran])
+    rows = sorted(set().union(*hits.values())) if hits else []
+    raw_verses = [f"{quran[i]['ref']}: {quran[i]['uthmani']}" for i in rows]
     
     if not raw_verses:
         if status_callback: status_callback("❌ لم يتم العثور على آيات مطابقة.")
@@ -160,7 +182,8 @@ def live_indexer_agent(model, topic_keyword, status_callback=None):
 # 3. أدوات البحث الجذري (للمحلل)
 # ==========================================
 def search_multi_roots_tool(roots_list):
-    if not QURAN_DATA: return "⚠️ قاعدة البيانات غير جاهزة."
+    quran = get_quran_data()
+    if not quran: return "⚠️ قاعدة البيانات غير جاهزة."
     report = ""
     for root in roots_list:
         # تنظيف الجذر من الرموز (مثل الأقواس)
@@ -168,35 +191,52 @@ def search_multi_roots_tool(roots_list):
         root = normalize_text(root.strip())
         if len(root) < 3: continue
         
-        chars = list(root)
-        # استخدام re.escape لتجنب أخطاء الريجيكس
-        pattern = fr"\w*{re.escape(chars[0])}\w*{re.escape(chars[1])}\w*{re.escape(chars[2])}\w*"
-        
-        matches = []
-        try:
-            for ayah in QURAN_DATA:
-                if re.search(pattern, ayah["normalized"]):
-                    matches.append(f"- {ayah['uthmani']} [{ayah['ref']}]")
-        except Exception as e:
-            print(f"Skipping root {root} due to error: {e}")
-            continue
+        # فهرس الجذور المحسوب مسبقاً بدل مسح كل آية بتعبير نمطي
+        rows = get_search_index().root_rows(root)
+        matches = [f"- {quran[i]['uthmani']} [{quran[i]['ref']}]" for i in rows]
 
         if matches:
             sample = matches[:4] 
             if len(matches) > 4: sample += random.sample(matches[4:], 2)
-            report += f"\n💎 **الجذر ({root}):** ورد {len(matches)} مرة. شواهد:\n" + "\n".join(sample) + "\n___\n"
+            # عدد المواضع بلفظ الجذر متصلاً (مصفوفة اللواحق، بحث لوغاريتمي)
+            contiguous = get_search_index().suffixes.count(normalize(root))
+            report += f"\n💎 **الجذر ({root}):** ورد في {len(matches)} آية، منها {contiguous} موضعاً بلفظه المتصل. شواهد:\n" + "\n".join(sample) + "\n___\n"
     return report if report else "لم يتم العثور على تطابق."
 
+def search_fragment_tool(fragment, max_positions=50):
+    """
+    للباحث: كل مواضع جزء كلمة أو عبارة (حتى عبر الكلمات) في القرآن كاملاً.
+    Returns a report with the total count and (verse, char offset) positions.
+    """
+    index = get_search_index()
+    nq = normalize(fragment)
+    if not nq: return "⚠️ أدخل نصاً للبحث."
+
+    occurrences = index.occurrences(nq)
+    total = sum(len(offsets) for offsets in occurrences.values())
+    if not total: return "لم يتم العثور على تطابق."
+
+    lines = []
+    for row, offsets in sorted(occurrences.items()):
+        v = index.verses[row]
+        for offset in offsets:
+            lines.append(f"- [{v['id']}] @{offset}: {index.texts[row][max(0, offset - 15):offset + len(nq) + 15]}")
+            if len(lines) >= max_positions: break
+        if len(lines) >= max_positions: break
+
+    return f"🔎 **({fragment}):** {total} موضعاً في {len(occurrences)} آية.\n" + "\n".join(lines)
+
 def search_prophet_story_tool(prophet_name):
     """
     للوكيل القصصي: البحث عن آيات نبي معين لبناء السياق
     """
-    if not QURAN_DATA: return None
+    quran = get_quran_data()
+    if not quran: return None
     
     name = normalize_text(prophet_name.strip())
     matches = []
     
-    for ayah in QURAN_DATA:
+    for ayah in quran:
         # بحث بسيط عن اسم النبي في النص
         if name in ayah["normalized"]:
             matches.append(f"[{ayah['ref']}] {ayah['uthmani']}")
@@ -1,14 +1,14 @@
 import google.generativeai as genai
 import json
 import time
-from quran_utils import load_quran_db
+from quran_utils import get_quran_data
 
 # إعداد الـ API
 genai.configure(api_key="")
 # يمكن استخدام Flash لسرعته، لكن Pro أدق في الفهم الموضوعي
 model = genai.GenerativeModel('gemini-3-flash-preview') 
 
-quran = load_quran_db()
+quran = get_quran_data()
 
 def build_thematic_index():
     """
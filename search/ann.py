@@ -0,0 +1,177 @@
+"""
+Nearest-neighbour indexes over embedding rows (topics, verses, ...)
+
+Two interchangeable backends with the same search / save / load interface:
+ExactIndex (one matrix-vector product, argpartition for the top k) and
+IVFFlatIndex (k-means cells, only the nprobe closest cells are scanned).
+Both return (rows, cosine scores), best first.
+
+    index = build_index(vectors, "ivf", nprobe=8)
+    index.save("quran_topic_vectors_v2.ann.npz", version=...)
+    rows, scores = load_index(path, version=...).search(q_vec, k=5)
+"""
+
+import os
+
+import numpy as np
+
+from search.vector_index import VectorIndex, normalize_rows, top_k
+
+EXACT_BELOW = 4096     # smaller collections are always searched exhaustively
+NPROBE = 8             # lists scanned per query (recall / speed knob)
+KMEANS_ITERATIONS = 20
+KMEANS_SAMPLE = 20000  # rows used to train the coarse quantizer
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force backend: the shared VectorIndex, persisted like the others"""
+
+    kind = "exact"
+
+    def search(self, q_vec, k=5, nprobe=None):
+        return super().search(q_vec, k)
+
+    def search_many(self, queries, k=5, nprobe=None):
+        return super().search_many(queries, k)
+
+    def built_with(self, **params):
+        return not params
+
+    def save(self, path, version=None):
+        np.savez(path, kind=np.array(self.kind), vectors=self.vectors,
+                 version=np.array(version or ""))
+
+    @classmethod
+    def _from_npz(cls, f):
+        return cls(f["vectors"], normalized=True)
+
+
+class IVFFlatIndex(VectorIndex):
+    """
+    Inverted-file index with flat (uncompressed) lists, in NumPy.
+
+    A k-means coarse quantizer splits the rows into nlist cells; rows are
+    stored grouped by cell (CSR layout: order + offsets). A query scores the
+    centroids, scans only the nprobe closest cells exactly and returns the
+    best k. nprobe = nlist is an exact search; collections smaller than
+    EXACT_BELOW are always searched exhaustively.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, vectors, nlist=None, nprobe=NPROBE, seed=0,
+                 normalized=False, _trained=None):
+        super().__init__(vectors, normalized)
+        self.nprobe = nprobe
+        self.seed = seed
+        n = len(self.vectors)
+        if _trained is not None:
+            self.centroids, self.order, self.offsets = _trained
+            return
+        nlist = nlist or max(1, int(np.sqrt(n)))
+        self.centroids = _kmeans(self.vectors, nlist, seed)
+        assign = np.argmax(self.vectors @ self.centroids.T, axis=1) if n else np.empty(0, int)
+        self.order = np.argsort(assign, kind="stable")
+        self.offsets = np.searchsorted(assign[self.order], np.arange(len(self.centroids) + 1))
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    def built_with(self, nlist=None, nprobe=None, seed=0):
+        """Whether IVFFlatIndex(vectors, nlist, seed=seed) gives these cells (nprobe is a query knob)"""
+        n = len(self.vectors)
+        return self.nlist == min(nlist or max(1, int(np.sqrt(n))), max(n, 1)) and self.seed == seed
+
+    def search(self, q_vec, k=5, nprobe=None):
+        """(rows, cosine scores) of the (approximate) k nearest rows, best first"""
+        q = normalize_rows(q_vec)[0]
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        if len(self) < EXACT_BELOW or nprobe >= self.nlist:
+            best, scores = top_k((self.vectors @ q)[None, :], k)
+            return best[0], scores[0]
+
+        cells = top_k((self.centroids @ q)[None, :], nprobe)[0][0]
+        rows = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in cells])
+        if len(rows) < k:
+            # Probed cells too small for k results: answer exactly instead
+            return self.search(q, k, self.nlist)
+        best, scores = top_k((self.vectors[rows] @ q)[None, :], k)
+        return rows[best[0]], scores[0]
+
+    def search_many(self, queries, k=5, nprobe=None):
+        """(rows, scores), each (len(queries), k), best first per query"""
+        queries = normalize_rows(queries)
+        if len(self) < EXACT_BELOW or min(nprobe or self.nprobe, self.nlist) >= self.nlist:
+            return top_k(queries @ self.vectors.T, k)
+        results = [self.search(q, k, nprobe) for q in queries]
+        return np.stack([r for r, _ in results]), np.stack([s for _, s in results])
+
+    def save(self, path, version=None):
+        np.savez(
+            path, kind=np.array(self.kind), vectors=self.vectors, centroids=self.centroids,
+            order=self.order, offsets=self.offsets, nprobe=np.array(self.nprobe),
+            seed=np.array(self.seed), version=np.array(version or ""),
+        )
+
+    @classmethod
+    def _from_npz(cls, f):
+        trained = (f["centroids"], f["order"], f["offsets"])
+        seed = int(f["seed"]) if "seed" in f.files else 0
+        return cls(f["vectors"], nprobe=int(f["nprobe"]), seed=seed, normalized=True, _trained=trained)
+
+
+def _kmeans(vectors, nlist, seed):
+    """Spherical k-means (cosine) on a sample of the rows"""
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    if n == 0:
+        return np.zeros((1, vectors.shape[1] if vectors.ndim == 2 else 0), dtype=np.float32)
+    nlist = min(nlist, n)
+    sample = vectors[rng.choice(n, size=min(n, max(KMEANS_SAMPLE, nlist)), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        empty = np.bincount(assign, minlength=nlist) == 0
+        # Empty cells restart on random rows instead of collapsing
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+BACKENDS = {"exact": ExactIndex, "ivf": IVFFlatIndex}
+
+
+def build_index(vectors, backend="ivf", **params):
+    """ANN index over the rows of `vectors` with the chosen backend"""
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown vector index backend: {backend}")
+    return BACKENDS[backend](vectors, **params)
+
+
+def load_index(path, version=None):
+    """Saved index of any backend; None if it was built for another version"""
+    with np.load(path) as f:
+        if version is not None and str(f["version"]) != version:
+            return None
+        return BACKENDS[str(f["kind"])]._from_npz(f)
+
+
+def load_or_build(vectors, path, version, backend="ivf", **params):
+    """
+    The index saved at path when it was built for this version, backend and
+    build parameters, else a fresh one (saved there). nprobe only changes
+    the search, so it is applied to a reused index instead.
+    """
+    if os.path.exists(path):
+        index = load_index(path, version)
+        if (index is not None and index.kind == backend and len(index) == len(vectors)
+                and index.built_with(**params)):
+            if params.get("nprobe"):
+                index.nprobe = params["nprobe"]
+            return index
+    index = build_index(vectors, backend, **params)
+    index.save(path, version=version)
+    return index
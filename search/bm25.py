@@ -0,0 +1,117 @@
+import heapq
+import math
+import pickle
+from array import array
+
+from search.text_normalizer import FULL_TABLE
+
+K1 = 1.5
+B = 0.75
+# Definite article (with its proclitics), stripped so "الرحيم" and "رحيم" are one term
+ARTICLES = ("وال", "فال", "بال", "ال")
+
+
+def terms(text):
+    """BM25 terms of a normalized text: fully folded words without the article"""
+    out = []
+    for word in text.translate(FULL_TABLE).split():
+        for article in ARTICLES:
+            if word.startswith(article) and len(word) - len(article) >= 3:
+                word = word[len(article):]
+                break
+        out.append(word)
+    return out
+
+
+class BM25:
+    """
+    Okapi BM25 over a list of normalized texts.
+
+    The term-statistics table (per-term postings with term frequencies, the
+    length of every text) is computed once; a query only walks the postings
+    of its own terms and keeps the best k rows in a bounded heap.
+    """
+
+    def __init__(self, texts, k1=K1, b=B, stats=None):
+        self.texts = texts
+        self.k1 = k1
+        self.b = b
+        if stats is None:
+            stats = self._build(texts)
+        self.lengths, self.postings = stats
+        self.avgdl = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        n = len(texts)
+        self.idf = {
+            term: math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            for term, (rows, _) in self.postings.items()
+        }
+
+    @staticmethod
+    def _build(texts):
+        lengths = array("I")
+        postings = {}
+        for row, text in enumerate(texts):
+            words = terms(text)
+            lengths.append(len(words))
+            counts = {}
+            for w in words:
+                counts[w] = counts.get(w, 0) + 1
+            for w, tf in counts.items():
+                rows, tfs = postings.setdefault(w, (array("I"), array("I")))
+                rows.append(row)
+                tfs.append(tf)
+        return lengths, postings
+
+    def scores(self, query, exclude=()):
+        """{row: BM25 score} of every text containing at least one query term"""
+        k1, b, avgdl, lengths = self.k1, self.b, self.avgdl, self.lengths
+        acc = {}
+        for term in set(terms(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            idf = self.idf[term]
+            for row, tf in zip(*posting):
+                if row in exclude:
+                    continue
+                norm = k1 * (1 - b + b * lengths[row] / avgdl)
+                acc[row] = acc.get(row, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        return acc
+
+    def top_k(self, query, k=20, exclude=()):
+        """Best k (row, score) pairs, highest score first (ties: corpus order)"""
+        acc = self.scores(query, exclude)
+        return heapq.nsmallest(k, acc.items(), key=lambda item: (-item[1], item[0]))
+
+    # --- persistence ---
+    def save(self, path, version=None):
+        data = {
+            "version": version,
+            "size": len(self.texts),
+            "k1": self.k1,
+            "b": self.b,
+            "lengths": self.lengths.tobytes(),
+            "postings": {
+                term: (rows.tobytes(), tfs.tobytes())
+                for term, (rows, tfs) in self.postings.items()
+            },
+        }
+        with open(path, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path, texts, version=None):
+        """Load saved statistics for `texts`; None if they were built for another corpus"""
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if data["version"] != version or data["size"] != len(texts):
+            return None
+        lengths = array("I")
+        lengths.frombytes(data["lengths"])
+        postings = {}
+        for term, (raw_rows, raw_tfs) in data["postings"].items():
+            rows, tfs = array("I"), array("I")
+            rows.frombytes(raw_rows)
+            tfs.frombytes(raw_tfs)
+            postings[term] = (rows, tfs)
+        return cls(texts, k1=data["k1"], b=data["b"], stats=(lengths, postings))
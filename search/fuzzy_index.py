@@ -0,0 +1,107 @@
+from array import array
+
+from search.bm25 import terms
+
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7  # deletes are generated on word prefixes only (SymSpell)
+
+
+def _deletes(word, distance):
+    """Every string obtained by removing up to `distance` characters"""
+    out = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+        out |= frontier
+    return out
+
+
+def edit_distance(a, b, limit=MAX_DISTANCE):
+    """Optimal string alignment distance (adjacent swaps cost 1); limit + 1 when larger"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def max_distance_for(word):
+    """Shorter words tolerate fewer typos (a 3-letter word at distance 2 matches anything)"""
+    if len(word) <= 3:
+        return 1 if len(word) == 3 else 0
+    return 1 if len(word) <= 5 else MAX_DISTANCE
+
+
+class FuzzyIndex:
+    """
+    Symmetric-delete dictionary over the corpus vocabulary (BM25 terms).
+
+    Every word is indexed under each string reachable by deleting up to
+    MAX_DISTANCE characters of its prefix; a query word generates its own
+    deletes and only the words sharing one are checked with edit_distance.
+    No scan of the vocabulary, whatever its size.
+    """
+
+    def __init__(self, texts, max_distance=MAX_DISTANCE):
+        self.max_distance = max_distance
+        postings = {}
+        for row, text in enumerate(texts):
+            for term in set(terms(text)):
+                postings.setdefault(term, array("I")).append(row)
+        self.words = list(postings)
+        self.postings = postings
+
+        deletes = {}
+        for wid, word in enumerate(self.words):
+            for d in _deletes(word[:PREFIX_LENGTH], max_distance):
+                deletes.setdefault(d, []).append(wid)
+        self.deletes = deletes
+
+    def lookup(self, word, max_distance=None):
+        """[(corpus word, distance)] within max_distance, closest then most frequent first"""
+        if max_distance is None:
+            max_distance = min(self.max_distance, max_distance_for(word))
+        if word in self.postings and max_distance == 0:
+            return [(word, 0)]
+
+        seen, found = set(), []
+        for d in _deletes(word[:PREFIX_LENGTH], max_distance):
+            for wid in self.deletes.get(d, ()):
+                if wid in seen:
+                    continue
+                seen.add(wid)
+                candidate = self.words[wid]
+                dist = edit_distance(word, candidate, max_distance)
+                if dist <= max_distance:
+                    found.append((candidate, dist))
+        found.sort(key=lambda item: (item[1], -len(self.postings[item[0]])))
+        return found
+
+    def search(self, query):
+        """
+        {row: total distance} of the texts holding a close match of every
+        query term (terms are ANDed, like the exact stage's phrase).
+        """
+        result = None
+        for term in terms(query):
+            best = {}
+            for word, dist in self.lookup(term):
+                for row in self.postings[word]:
+                    if dist < best.get(row, MAX_DISTANCE + 1):
+                        best[row] = dist
+            if result is None:
+                result = best
+            else:
+                result = {row: result[row] + d for row, d in best.items() if row in result}
+            if not result:
+                return {}
+        return result or {}
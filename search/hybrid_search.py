@@ -1,5 +1,6 @@
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
+from embedding_cache import encode_query
+from search.text_normalizer import normalize_semantic
+from search.vector_index import VectorIndex
 
 def hybrid_search(
     query,
@@ -11,16 +12,20 @@ def hybrid_search(
 ):
     """
     alpha = weight for graph (semantic certainty)
+    topic_vectors = a search.ann / VectorIndex (or a raw matrix, wrapped in a VectorIndex)
     """
 
     # --- Semantic ---
-    q_vec = model.encode(query)
-    sims = cosine_similarity([q_vec], topic_vectors)[0]
+    index = topic_vectors
+    if not hasattr(index, "search"):
+        index = VectorIndex(topic_vectors)
+    # Topic vectors are built from the "semantic" profile (quran_analyzer_v2)
+    rows, sims = index.search(encode_query(model, normalize_semantic(query)), k=5)
 
     semantic_hits = {
-        topics[i]["id"]: float(sims[i])
-        for i in np.argsort(sims)[-5:]
-        if sims[i] > 0.3
+        topics[i]["id"]: float(s)
+        for i, s in zip(rows, sims)
+        if s > 0.3
     }
 
     # --- Graph ---
@@ -0,0 +1,174 @@
+import os
+
+from search.text_normalizer import normalize
+from search.ngram_index import NgramIndex
+from search.suffix_array import SuffixArray
+from search.bm25 import BM25
+from search.fuzzy_index import FuzzyIndex
+from search.positional_index import PositionalIndex
+from search.suggest import Suggester
+from search.root_matcher import RootIndex, query_root, root_index
+
+
+def normalized_text(v):
+    # corpus.verses() carries the precomputed "search" profile column
+    return v.get("normalized") or normalize(v["text"])
+
+
+def index_path(corpus, name):
+    """Where a persisted index for this snapshot lives (next to the snapshot)"""
+    return os.path.splitext(corpus.path)[0] + f"_{name}.pkl"
+
+
+class SearchIndex:
+    """
+    Query-time structures over a verse list, built once and shared by every
+    search_verses call. Row i of every structure is verses[i]. Structures
+    not passed in are built on first use, so an ad-hoc SearchIndex(verses)
+    only pays for what its query needs.
+    """
+
+    def __init__(
+        self, verses, version=None, ngrams=None, suffixes=None, roots=None, bm25=None,
+        positional=None, embeddings=None
+    ):
+        self.verses = verses
+        self.version = version
+        self.texts = [normalized_text(v) for v in verses]
+        self.ngrams = ngrams  # only needed without a suffix array
+        self.suffixes = suffixes
+        self.roots = roots
+        self.bm25 = bm25
+        self.fuzzy = None
+        self.positional = positional
+        self.suggester = None
+        # Optional (len(verses), dim) float32 matrix of L2-normalized verse vectors
+        self.embeddings = embeddings
+        self.vector_index = None
+        self.vector_rows = None  # verse row of each vector_index row
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """Index corpus.verses(), reusing the persisted indexes when they are current"""
+        verses = corpus.verses()
+        texts = [normalized_text(v) for v in verses]
+        # The suffix array answers exact() and occurrences(): no n-gram index here
+        suffixes = _load_or_build(corpus, "suffixes", SuffixArray, texts)
+        bm25 = _load_or_build(corpus, "bm25", BM25, texts)
+        return cls(
+            verses, version=corpus.version,
+            suffixes=suffixes, roots=root_index(corpus), bm25=bm25,
+            positional=PositionalIndex.from_corpus(corpus),
+            embeddings=_load_embeddings(corpus)
+        )
+
+    def __len__(self):
+        return len(self.verses)
+
+    def exact(self, nq):
+        """
+        Rows whose normalized text contains the normalized query: from the
+        suffix array when there is one, else n-gram postings (built on first use).
+        """
+        if self.suffixes is not None:
+            return sorted(self.suffixes.rows(nq))
+        if self.ngrams is None:
+            self.ngrams = NgramIndex(self.texts)
+        return self.ngrams.search(nq)
+
+    def root_rows(self, query):
+        """Rows containing a word of the query's root (dictionary lookup)"""
+        root = query_root(query)
+        if not root:
+            return []
+        if self.roots is None:
+            self.roots = RootIndex.from_texts(self.texts)
+        return self.roots.verses(root)
+
+    def ranked(self, nq, k=20, exclude=()):
+        """
+        Top-k (row, score) by BM25, best first. The term statistics are
+        built on first use when the index has none.
+        """
+        if self.bm25 is None:
+            self.bm25 = BM25(self.texts)
+        return self.bm25.top_k(nq, k, exclude)
+
+    def fuzzy_rows(self, nq):
+        """
+        [(row, edit distance)] of the rows matching every query word within
+        a small edit distance, closest first. The symmetric-delete
+        dictionary is built on first use.
+        """
+        if self.fuzzy is None:
+            self.fuzzy = FuzzyIndex(self.texts)
+        return sorted(self.fuzzy.search(nq).items(), key=lambda item: (item[1], item[0]))
+
+    def phrase(self, words):
+        """{row: [start word positions]} of an exact word sequence"""
+        if self.positional is None:
+            self.positional = PositionalIndex.from_texts(self.texts)
+        return self.positional.phrase(words)
+
+    def near(self, a, b, distance):
+        """{row: [(pos a, pos b)]} of a and b at most `distance` words apart"""
+        if self.positional is None:
+            self.positional = PositionalIndex.from_texts(self.texts)
+        return self.positional.near(a, b, distance)
+
+    def suggest(self, prefix, k=None):
+        """Most frequent corpus words starting with prefix: [(word, frequency)]"""
+        if self.suggester is None:
+            self.suggester = Suggester.from_texts(self.texts)
+        return self.suggester.suggest(prefix, k)
+
+    def semantic(self, q_vec, threshold):
+        """
+        [(row, cosine)] of the verses at or above threshold, in row order.
+        Searches the verse matrix, else the verses' own "embedding" vectors
+        (normalized once, on first use); [] when there are neither.
+        """
+        if self.vector_rows is None:
+            from search.vector_index import VectorIndex
+
+            if self.embeddings is not None:
+                # The persisted matrix is already normalized: search it in place (mmap)
+                self.vector_index = VectorIndex(self.embeddings, normalized=True)
+                self.vector_rows = range(len(self.verses))
+            else:
+                self.vector_rows = [i for i, v in enumerate(self.verses) if "embedding" in v]
+                if self.vector_rows:
+                    self.vector_index = VectorIndex([self.verses[i]["embedding"] for i in self.vector_rows])
+        if self.vector_index is None:
+            return []
+        rows, sims = self.vector_index.above(q_vec, threshold)
+        return [(int(self.vector_rows[j]), float(s)) for j, s in zip(rows, sims)]
+
+    def occurrences(self, nq):
+        """
+        {row: [char offsets]} of every occurrence of nq in the normalized texts.
+        Needs the suffix array (built on first use when the index has none).
+        """
+        if self.suffixes is None:
+            self.suffixes = SuffixArray(self.texts)
+        return self.suffixes.rows(nq)
+
+
+def _load_embeddings(corpus):
+    # Built offline (python verse_embeddings.py); the semantic stage needs numpy
+    try:
+        from verse_embeddings import load_embeddings
+    except ImportError:
+        return None
+    return load_embeddings(corpus)
+
+
+def _load_or_build(corpus, name, cls, texts):
+    path = index_path(corpus, name)
+    index = None
+    if os.path.exists(path):
+        index = cls.load(path, texts, version=corpus.version)
+    if index is None:
+        index = cls(texts)
+        index.save(path, version=corpus.version)
+    return index
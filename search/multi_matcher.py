@@ -0,0 +1,131 @@
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
+
+# Below this many keywords, rows() runs one C-level `in` scan per keyword:
+# on a corpus-sized benchmark the scan still beat the pure-Python automaton
+# pass at ~250 distinct keywords (0.09 s vs 0.14 s). The scan grows linearly
+# with the keyword count, the automaton pass barely does.
+SCAN_THRESHOLD = 256
+
+
+class MultiMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of keywords.
+
+    The trie of the keywords is completed into a DFA (every state has a
+    transition for every character of the keywords' alphabet, characters
+    outside it go back to the root), so a text is matched against all
+    keywords in one left-to-right pass, whatever their number. The automaton
+    is built on first use: rows() on fewer than SCAN_THRESHOLD keywords
+    never needs it.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = [p for p in dict.fromkeys(patterns) if p]
+        self._automaton = None
+
+    def automaton(self):
+        """(delta, out) transition and output tables, built once"""
+        if self._automaton is None:
+            self._automaton = self._build()
+        return self._automaton
+
+    def _build(self):
+        goto, out = [{}], [()]
+        for pid, pattern in enumerate(self.patterns):
+            state = 0
+            for c in pattern:
+                nxt = goto[state].get(c)
+                if nxt is None:
+                    nxt = goto[state][c] = len(goto)
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            out[state] += (pid,)
+
+        # Breadth-first: fail links, inherited outputs, completed transitions
+        fail = [0] * len(goto)
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            f = fail[state]
+            out[state] += out[f]
+            delta[state] = {**delta[f], **goto[state]}
+            for c, nxt in goto[state].items():
+                fail[nxt] = delta[f].get(c, 0) if state else 0
+                queue.append(nxt)
+        return delta, out
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def iter_matches(self, text):
+        """Yield (end offset, pattern id) of every occurrence, overlaps included"""
+        delta, out = self.automaton()
+        state = 0
+        for i, c in enumerate(text):
+            state = delta[state].get(c, 0)
+            for pid in out[state]:
+                yield i + 1, pid
+
+    def found(self, text):
+        """Ids of the patterns occurring in text"""
+        delta, out = self.automaton()
+        state, hits = 0, set()
+        for c in text:
+            state = delta[state].get(c, 0)
+            if out[state]:
+                hits.update(out[state])
+        return hits
+
+    def search(self, text):
+        """True if any pattern occurs in text"""
+        delta, out = self.automaton()
+        state = 0
+        for c in text:
+            state = delta[state].get(c, 0)
+            if out[state]:
+                return True
+        return False
+
+    def rows(self, texts, separator="\n"):
+        """
+        {pattern id: sorted rows} over a list of texts, in a single pass
+        over their concatenation (patterns never contain the separator).
+        Small keyword sets fall back to a substring scan per keyword.
+        """
+        if len(self.patterns) < SCAN_THRESHOLD:
+            hits = {}
+            for pid, pattern in enumerate(self.patterns):
+                found = [row for row, text in enumerate(texts) if pattern in text]
+                if found:
+                    hits[pid] = found
+            return hits
+
+        starts, pos = [], 0
+        for t in texts:
+            starts.append(pos)
+            pos += len(t) + len(separator)
+        delta, out = self.automaton()
+        state, hits = 0, {}
+        for i, c in enumerate(separator.join(texts)):
+            state = delta[state].get(c, 0)
+            if out[state]:
+                row = bisect_right(starts, i) - 1
+                for pid in out[state]:
+                    found = hits.setdefault(pid, [])
+                    if not found or found[-1] != row:
+                        found.append(row)
+        return hits
+
+
+@lru_cache(maxsize=128)
+def _cached(patterns):
+    return MultiMatcher(patterns)
+
+
+def matcher(patterns):
+    """Shared matcher for a keyword set, one per distinct set (its automaton is built lazily)"""
+    return _cached(tuple(patterns))
@@ -0,0 +1,63 @@
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+NGRAM_SIZE = 3
+
+
+class NgramIndex:
+    """
+    Character n-gram inverted index over a list of normalized texts.
+
+    Every text is indexed under each of its distinct n-grams. A substring
+    query intersects the posting lists of its own n-grams (smallest first)
+    and verifies the few surviving candidates with `in`, instead of
+    scanning every text. Kept in memory only: it is the fallback of
+    SearchIndex.exact() for ad-hoc indexes without a suffix array, and is
+    cheap to build for them.
+    """
+
+    def __init__(self, texts, n=NGRAM_SIZE):
+        self.texts = texts
+        self.n = n
+        self.postings = self._build(texts, n)
+
+    @staticmethod
+    def _build(texts, n):
+        postings = defaultdict(list)
+        for i, text in enumerate(texts):
+            for gram in {text[j:j + n] for j in range(len(text) - n + 1)}:
+                postings[gram].append(i)
+        return {gram: array("I", ids) for gram, ids in postings.items()}
+
+    def candidates(self, query):
+        """Sorted text ids that contain every n-gram of the query"""
+        n = self.n
+        if len(query) < n:
+            return range(len(self.texts))
+
+        grams = {query[j:j + n] for j in range(len(query) - n + 1)}
+        lists = []
+        for gram in grams:
+            ids = self.postings.get(gram)
+            if ids is None:
+                return []
+            lists.append(ids)
+        lists.sort(key=len)
+
+        result = list(lists[0])
+        for ids in lists[1:]:
+            result = [i for i in result if _contains(ids, i)]
+            if not result:
+                break
+        return result
+
+    def search(self, query):
+        """Sorted ids of the texts containing `query` as a substring"""
+        texts = self.texts
+        return [i for i in self.candidates(query) if query in texts[i]]
+
+
+def _contains(sorted_ids, i):
+    pos = bisect_left(sorted_ids, i)
+    return pos < len(sorted_ids) and sorted_ids[pos] == i
@@ -0,0 +1,99 @@
+import re
+from array import array
+
+from search.bm25 import terms
+
+NEAR_DEFAULT = 5
+PHRASE = re.compile(r'^\s*["«“](.+?)["»”]\s*$')
+NEAR = re.compile(r"^\s*(\S+)\s+NEAR(?:/(\d+))?\s+(\S+)\s*$", re.IGNORECASE)
+
+
+def parse_query(query):
+    """
+    Positional operators of a raw query:
+        "رب العالمين"     -> ("phrase", ["رب", "عالمين"])
+        صبر NEAR/3 صلاه   -> ("near", ["صبر", "صلاه"], 3)
+    None for a plain query.
+    """
+    m = PHRASE.match(query)
+    if m:
+        words = terms(m.group(1))
+        return ("phrase", words) if words else None
+    m = NEAR.match(query)
+    if m:
+        a, b = terms(m.group(1)), terms(m.group(3))
+        if a and b:
+            return ("near", [a[0], b[0]], int(m.group(2) or NEAR_DEFAULT))
+    return None
+
+
+class PositionalIndex:
+    """
+    term -> (verse rows, word positions) inverted index.
+
+    Positions count the verse's words that have a term (pause marks and
+    other annotation-only tokens are skipped), so "within n words" and
+    phrases are diacritic- and mark-insensitive. Postings are sorted by
+    (row, position).
+    """
+
+    def __init__(self, postings):
+        self.postings = postings
+
+    @classmethod
+    def from_words(cls, words):
+        """words: iterable of (row, word) in corpus order"""
+        postings = {}
+        row_seen, pos = -1, 0
+        for row, word in words:
+            if row != row_seen:
+                row_seen, pos = row, 0
+            for term in terms(word):
+                rows, positions = postings.setdefault(term, (array("I"), array("I")))
+                rows.append(row)
+                positions.append(pos)
+                pos += 1
+        return cls(postings)
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """Built from the snapshot's token table (no re-tokenization)"""
+        tokens = corpus.tokens
+        return cls.from_words(zip(tokens.verse, tokens.forms("search")))
+
+    @classmethod
+    def from_texts(cls, texts):
+        return cls.from_words((row, w) for row, text in enumerate(texts) for w in text.split())
+
+    def _occurrences(self, term):
+        rows, positions = self.postings.get(term, ((), ()))
+        return zip(rows, positions)
+
+    def phrase(self, words):
+        """{row: [start word positions]} of the consecutive sequence `words`"""
+        if not words:
+            return {}
+        # Rarest term first: every other term must sit at its offset from it
+        order = sorted(range(len(words)), key=lambda i: len(self.postings.get(words[i], ((),))[0]))
+        first = order[0]
+        starts = {(row, pos - first) for row, pos in self._occurrences(words[first])}
+        for i in order[1:]:
+            if not starts:
+                break
+            starts &= {(row, pos - i) for row, pos in self._occurrences(words[i])}
+        hits = {}
+        for row, pos in sorted(starts):
+            hits.setdefault(row, []).append(pos)
+        return hits
+
+    def near(self, a, b, distance=NEAR_DEFAULT):
+        """{row: [(pos a, pos b)]} of the pairs at most `distance` words apart, any order"""
+        by_row = {}
+        for row, pos in self._occurrences(b):
+            by_row.setdefault(row, []).append(pos)
+        hits = {}
+        for row, pa in self._occurrences(a):
+            for pb in by_row.get(row, ()):
+                if pb != pa and abs(pb - pa) <= distance:
+                    hits.setdefault(row, []).append((pa, pb))
+        return hits
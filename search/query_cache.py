@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+
+QUERY_CACHE_SIZE = 512
+
+
+class QueryCache:
+    """
+    Thread-safe LRU of search results keyed by (normalized query, mode,
+    corpus version, ...). One instance is shared by every session of the
+    process; when a key carries a new corpus version, every entry of the
+    old version is dropped.
+    """
+
+    def __init__(self, maxsize=QUERY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, version, compute):
+        """Cached value for key, else compute() (outside the lock) and store it"""
+        with self._lock:
+            if version != self.version:
+                self._data.clear()
+                self.version = version
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            if version == self.version:
+                self._data[key] = value
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "version": self.version,
+        }
@@ -1,10 +1,224 @@
+from array import array
+from functools import lru_cache
+
+from search.text_normalizer import FULL_TABLE
+
 COMMON_ROOTS = {
     "شيء": ["شيء", "اشياء", "شيئا", "كل شيء"],
     "علم": ["علم", "يعلم", "عليم", "اعلم"],
 }
 
+# Words the light stemmer cannot reduce by pattern (irregular / weak forms)
+ROOT_LOOKUP = {form: root for root, forms in COMMON_ROOTS.items() for form in forms}
+ROOT_LOOKUP.update({
+    "الله": "اله", "لله": "اله", "اللهم": "اله",
+    "قال": "قول", "قالوا": "قول", "يقول": "قول", "يقولون": "قول", "قل": "قول", "قيل": "قول",
+    "كان": "كون", "كانوا": "كون", "يكون": "كون", "يكن": "كون", "كن": "كون",
+    # Frequent short nouns behind ب / ل (بربهم، لقومه): lets the proclitic come off
+    "رب": "ربب", "قوم": "قوم",
+    "جنه": "جنن", "جنات": "جنن", "وجوه": "وجه", "فرعون": "فرعن",
+    "ان": "", "من": "", "في": "", "الي": "", "علي": "", "عن": "", "ما": "", "لا": "",
+    "الذي": "", "الذين": "", "التي": "", "هو": "", "هم": "", "ذلك": "", "هذا": "",
+})
+
+# Hamza carriers fold to alef, like أ / إ / آ already do in the "full" profile
+HAMZA_FORMS = str.maketrans({"ؤ": "ا", "ئ": "ا", "ء": "ا"})
+# While stemming, the seats fold to a bare hamza instead: an alef there would
+# read as a pattern letter (مؤمن -> مامن -> فاعل -> ممن)
+HAMZA_SEATS = str.maketrans({"ؤ": "ء", "ئ": "ء"})
+
+def fold(text):
+    """Root-matching form: "full" profile plus hamza folding"""
+    return text.translate(FULL_TABLE).translate(HAMZA_FORMS).strip()
+
+def _stem_form(text):
+    return text.translate(FULL_TABLE).translate(HAMZA_SEATS).strip()
+
+ROOT_LOOKUP = {_stem_form(form): fold(root) for form, root in ROOT_LOOKUP.items()}
+
+# Longest first: the first match wins
+PREFIXES = ("وبال", "فبال", "وال", "فال", "بال", "كال", "ولل", "فلل", "لل", "ال")
+# Single-letter proclitics that also start many roots (وجد، فتح، كتب، بعد، لقي،
+# سمع): only stripped when a four-letter stem remains once the suffixes are
+# off, or when the stem is in ROOT_LOOKUP. At most two (و / ف then ب ل ك س)
+SHORT_PREFIXES = ("و", "ف", "ب", "ل", "ك", "س")
+DERIVED_PREFIXES = ("است", "يست", "تست", "نست", "مست")
+SUFFIXES = (
+    "كموها", "تموهم", "هما", "كما", "تما", "تموه", "ناهم", "ونها",
+    "ات", "ون", "ين", "ان", "وا", "هم", "هن", "كم", "كن", "نا", "ها", "ني", "تم", "ته", "يه",
+    "ه", "ي", "ك", "ت", "ا",
+)
+VERB_PREFIXES = "يتنا"
+AUGMENT_LETTERS = "امتنيو"
+
+
+def _strip(word, affixes, from_start, keep=3):
+    for a in affixes:
+        if from_start and word.startswith(a) and len(word) - len(a) >= keep:
+            return word[len(a):]
+        if not from_start and word.endswith(a) and len(word) - len(a) >= keep:
+            return word[:-len(a)]
+    return word
+
+
+def _pattern_root(w):
+    """Drop the augment letters of the common morphological patterns"""
+    n = len(w)
+    if n == 2:
+        return w + w[-1]                      # doubled: مد -> مدد
+    if n == 3:
+        if w[1] in "اء":
+            return w[0] + "و" + w[2]          # hollow: قام -> قوم (سأل folds alike)
+        if w[2] == "ا":
+            return w[:2] + "و"                # defective: دعا / صلاة -> دعو / صلو
+        return w
+    if n == 4:
+        if w[0] == "ي":
+            return _pattern_root(w[1:])       # يفعل
+        if w[1] == "ا":
+            return w[0] + w[2] + w[3]         # فاعل
+        if w[2] in "اوي":
+            return w[0] + w[1] + w[3]         # فعال / فعول / فعيل
+        if w[0] in "امتن":
+            return _pattern_root(w[1:])       # افعل / مفعل / تفعل / نفعل
+        return w[:3]
+    if n == 5:
+        if w[0] == "م" and w[3] == "و":
+            return w[1] + w[2] + w[4]         # مفعول
+        if w[0] in "مت" and w[2] == "ا":
+            return w[1] + w[3] + w[4]         # مفاعل / تفاعل
+        if w[0] == "ا" and w[2] == "ت":
+            return w[1] + w[3] + w[4]         # افتعل
+        if w[0] == "ا" and w[3] == "ا":
+            return w[1] + w[2] + w[4]         # افعال: انهار -> نهر
+        if w[0] == "ا" and w[1] == "ن":
+            return _pattern_root(w[2:])       # انفعل
+        if w[0] in "مت" and w[3] == "ي":
+            return w[1] + w[2] + w[4]         # تفعيل
+        if w[0] == "م" and w[1] == "ت":
+            return _pattern_root(w[2:])       # متفعل
+        if w[0] in AUGMENT_LETTERS:
+            return _pattern_root(w[1:])
+        return _pattern_root(w[:4])
+    if w.startswith(("است", "مست")):
+        return _pattern_root(w[3:])           # استفعل / مستفعل
+    if w[0] == "ا" and w[2] == "ت" and w[4] == "ا":
+        return w[1] + w[3] + w[5]             # افتعال
+    if w[0] in AUGMENT_LETTERS:
+        return _pattern_root(w[1:])
+    return _pattern_root(w[:5])
+
+
+@lru_cache(maxsize=None)
+def extract_root(word):
+    """
+    Light-stemmer root extraction: lookup table, then clitic / affix
+    stripping, then pattern templates. Returns "" for particles.
+    """
+    w = _stem_form(word)
+    if len(w) < 2:
+        return ""
+    if w in ROOT_LOOKUP:
+        return ROOT_LOOKUP[w]
+
+    stem = _strip(w, PREFIXES, from_start=True)
+    short_prefix = stem == w  # a one-letter proclitic may still be there
+    w = stem
+    if w in ROOT_LOOKUP:
+        return ROOT_LOOKUP[w]
+    w = _strip(w, DERIVED_PREFIXES, from_start=True)
+    stem = _strip(w, SUFFIXES, from_start=False)
+    if not (len(stem) == 3 and stem[0] in "يوف" and w[3:] == "ي"):
+        w = stem  # يهدي / فهدى keep their weak last letter
+    if w in ROOT_LOOKUP:
+        return ROOT_LOOKUP[w]
+    if len(w) > 4:
+        w = _strip(w, SUFFIXES, from_start=False)
+    if short_prefix:
+        # Judged on the suffix-free stem: كفروا -> كفر and وجدوا -> وجد keep
+        # their first letter, لمساجد -> مساجد and وبربهم -> رب lose the proclitic
+        for _ in range(2):
+            if not w.startswith(SHORT_PREFIXES):
+                break
+            if w[1:] in ROOT_LOOKUP:
+                return ROOT_LOOKUP[w[1:]]
+            # و / ف also come off a bare three-letter stem (فوجد، ووجد) unless
+            # the four letters form a pattern of their own (فاسق، وكيل)
+            conjunction = len(w) == 4 and w[0] in "وف" and w[1] != "ا" and w[2] not in "اوي"
+            if len(w) - 1 < 4 and not conjunction:
+                break
+            w = w[1:]
+    if len(w) > 3 and w[0] in VERB_PREFIXES:
+        if w[1:] in ROOT_LOOKUP:
+            return ROOT_LOOKUP[w[1:]]
+    return _pattern_root(w).replace("ء", "ا")
+
+
+def query_root(query):
+    """Root for a user query: an explicit three-letter root is kept, in indexed form (سأل -> سول)"""
+    q = _stem_form(query)
+    if q in ROOT_LOOKUP:
+        return ROOT_LOOKUP[q]
+    if len(q) == 3:
+        return _pattern_root(q).replace("ء", "ا")
+    return extract_root(q)
+
+
 def root_match(query: str, verse_text: str) -> bool:
-    for root, forms in COMMON_ROOTS.items():
-        if query in forms:
-            return any(f in verse_text for f in forms)
-    return False
+    root = query_root(query)
+    if not root:
+        return False
+    return any(extract_root(w) == root for w in verse_text.split())
+
+
+class RootIndex:
+    """
+    root -> token rows posting index over the corpus token table.
+    Roots are extracted offline when the snapshot is built (tok_root column).
+    """
+
+    def __init__(self, roots, token_verse):
+        self.token_verse = token_verse
+        postings = {}
+        for i, root in enumerate(roots):
+            if root:
+                postings.setdefault(root, []).append(i)
+        self.postings = {root: array("I", rows) for root, rows in postings.items()}
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        tokens = corpus.tokens
+        return cls(tokens.roots(), tokens.verse)
+
+    @classmethod
+    def from_texts(cls, texts):
+        """Index plain texts (no snapshot): words are whitespace-split"""
+        roots, token_verse = [], array("I")
+        for row, text in enumerate(texts):
+            for word in text.split():
+                roots.append(extract_root(word))
+                token_verse.append(row)
+        return cls(roots, token_verse)
+
+    def __contains__(self, root):
+        return root in self.postings
+
+    def tokens(self, root):
+        """Token rows of every word derived from root"""
+        return self.postings.get(root, ())
+
+    def verses(self, root):
+        """Sorted verse rows containing a word of root"""
+        verse = self.token_verse
+        return sorted({verse[i] for i in self.tokens(root)})
+
+
+_ROOT_INDEXES = {}
+
+def root_index(corpus):
+    """RootIndex of a corpus snapshot, built once per corpus version"""
+    key = (corpus.path, corpus.version)
+    index = _ROOT_INDEXES.get(key)
+    if index is None:
+        index = _ROOT_INDEXES[key] = RootIndex.from_corpus(corpus)
+    return index
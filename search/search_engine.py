@@ -1,56 +1,218 @@
-from search.text_normalizer import normalize
+from itertools import islice
+from typing import NamedTuple, Optional
+
+from search.text_normalizer import normalize, normalize_semantic
 from search.root_matcher import root_match
+from search.index import SearchIndex, normalized_text as _normalized
+from search.query_cache import QueryCache
+from search.positional_index import parse_query
 from data.muqattaat import MUQATTAAT_VERSES
 
 SIMILARITY_THRESHOLD = 0.92
+TOP_K = 20
+PAGE_SIZE = 20
+RANK_DEPTH = 100  # cached results (BM25 rankings and stage hits) are kept in blocks of this many hits
 
-def search_verses(
+# Shared by every caller (and every Streamlit session) in the process
+QUERY_CACHE = QueryCache()
+
+
+class SearchHit(NamedTuple):
+    """One result: the verse's row in the searched list, its id and why it matched"""
+    row: int
+    id: str
+    reason: str
+    score: Optional[float] = None
+    positions: Optional[list] = None
+
+
+def iter_hits(
     query: str,
     verses: list,
-    embeddings_model=None
+    embeddings_model=None,
+    index=None,
+    mode="stages",
+    k=TOP_K
 ):
-    results = []
+    """
+    Lazily yield SearchHit records, best stage first; nothing is copied.
+    Rows point into index.verses when an index is given, else into verses.
+    mode: "stages" (exact -> root -> fuzzy -> semantic; a stage runs only
+    if the previous ones found nothing) or "bm25" (the k most relevant,
+    best first). Fuzzy hits carry their edit distance as score.
+    A quoted query ("...") or `A NEAR/n B` bypasses both modes: hits are
+    read from the positional index, with word positions.
+    """
+    if mode not in ("stages", "bm25"):
+        raise ValueError(f"unknown search mode: {mode}")
+
+    # Positional operators: "exact phrase" / A NEAR/n B, answered from postings
+    operator = parse_query(query)
+    if operator is not None:
+        index = index if index is not None else SearchIndex(verses)
+        if operator[0] == "phrase":
+            matches = index.phrase(operator[1])
+        else:
+            (a, b), distance = operator[1], operator[2]
+            matches = index.near(a, b, distance)
+        for i, positions in sorted(matches.items()):
+            v = index.verses[i]
+            if v["id"] not in MUQATTAAT_VERSES:
+                yield SearchHit(i, v["id"], operator[0], positions=positions)
+        return
+
     nq = normalize(query)
+    if not nq:
+        # "" / whitespace: nothing to look for (and nothing to send to the model)
+        return
+
+    if mode == "bm25":
+        index = index if index is not None else SearchIndex(verses)
+        skip = {i for i, v in enumerate(index.verses) if v["id"] in MUQATTAAT_VERSES}
+        for i, score in index.ranked(nq, k, exclude=skip):
+            yield SearchHit(i, index.verses[i]["id"], "bm25", round(score, 2))
+        return
+
+    found = False
 
     # المرحلة 1️⃣ Exact Match
-    for v in verses:
-        if v["id"] in MUQATTAAT_VERSES:
-            continue
+    if index is not None and index.suffixes is not None:
+        # Suffix array: matching verses and the offsets of every occurrence
+        for i, positions in sorted(index.occurrences(nq).items()):
+            v = index.verses[i]
+            if v["id"] not in MUQATTAAT_VERSES:
+                found = True
+                yield SearchHit(i, v["id"], "exact", positions=positions)
+    elif index is not None:
+        # n-gram postings narrow the candidates before the substring check
+        for i in index.exact(nq):
+            v = index.verses[i]
+            if v["id"] not in MUQATTAAT_VERSES:
+                found = True
+                yield SearchHit(i, v["id"], "exact")
+    else:
+        for i, v in enumerate(verses):
+            if v["id"] in MUQATTAAT_VERSES:
+                continue
+
+            if nq in _normalized(v):
+                found = True
+                yield SearchHit(i, v["id"], "exact")
 
-        text_norm = normalize(v["text"])
-        if nq in text_norm:
-            results.append({**v, "reason": "exact"})
-    
-    if results:
-        return results
+    if found:
+        return
 
     # المرحلة 2️⃣ Root Match
-    for v in verses:
-        if v["id"] in MUQATTAAT_VERSES:
-            continue
+    if index is not None:
+        # Precomputed root -> verse postings
+        for i in index.root_rows(nq):
+            v = index.verses[i]
+            if v["id"] not in MUQATTAAT_VERSES:
+                found = True
+                yield SearchHit(i, v["id"], "root")
+    else:
+        for i, v in enumerate(verses):
+            if v["id"] in MUQATTAAT_VERSES:
+                continue
+
+            if root_match(nq, _normalized(v)):
+                found = True
+                yield SearchHit(i, v["id"], "root")
 
-        if root_match(nq, normalize(v["text"])):
-            results.append({**v, "reason": "root"})
-    
-    if results:
-        return results
+    if found:
+        return
 
-    # المرحلة 3️⃣ Semantic (آخر حل)
+    # المرحلة 3️⃣ Fuzzy (أخطاء الكتابة: همزة أو حرف ناقص/زائد) - needs the index
+    if index is not None:
+        for i, distance in index.fuzzy_rows(nq):
+            v = index.verses[i]
+            if v["id"] not in MUQATTAAT_VERSES:
+                found = True
+                yield SearchHit(i, v["id"], "fuzzy", distance)
+
+    if found:
+        return
+
+    # المرحلة 4️⃣ Semantic (آخر حل)
     if embeddings_model is None:
-        return []
+        return
+
+    from embedding_cache import encode_query
+    # Same profile as the verse vectors (verse_embeddings.PROFILE)
+    q_vec = encode_query(embeddings_model, normalize_semantic(query))
+
+    # One matrix-vector product over the verse matrix, or over the verse-dict
+    # vectors (normalized once per index)
+    index = index if index is not None else SearchIndex(verses)
+    for i, score in index.semantic(q_vec, SIMILARITY_THRESHOLD):
+        v = index.verses[i]
+        if v["id"] not in MUQATTAAT_VERSES:
+            yield SearchHit(i, v["id"], "semantic", round(score * 100, 2))
+
+
+def cached_hits(query, verses, embeddings_model=None, index=None,
+                mode="stages", depth=RANK_DEPTH, cache=QUERY_CACHE):
+    """
+    The first `depth` hits of the query as a tuple, from the LRU when the
+    same (normalized query, mode, depth, corpus version) was already
+    searched. BM25 ranks exactly `depth` verses and the stage cascade is cut
+    after `depth` hits, so an entry never holds more than that.
+    Needs an index with a corpus version; otherwise nothing is cached.
+    """
+    version = getattr(index, "version", None)
+    k = depth if mode == "bm25" else TOP_K
+    compute = lambda: tuple(islice(iter_hits(query, verses, embeddings_model, index, mode, k), depth))
+    if cache is None or version is None:
+        return compute()
+    key = (normalize(query), mode, depth, embeddings_model is not None)
+    return cache.get_or_compute(key, version, compute)
+
 
-    q_vec = embeddings_model.encode(query)
+def search_page(query, verses, embeddings_model=None, index=None,
+                mode="stages", limit=PAGE_SIZE, offset=0, cache=None):
+    """
+    One page of hits (SearchHit list): only the first offset + limit hits
+    are ever produced, so the first page of a broad query is immediate.
+    With a QueryCache the hits are cached in blocks of RANK_DEPTH and pages
+    are sliced from the smallest block that covers them.
+    """
+    if cache is not None:
+        # Round up so consecutive pages share one cached block
+        depth = -(-(offset + limit) // RANK_DEPTH) * RANK_DEPTH
+        hits = cached_hits(query, verses, embeddings_model, index, mode, depth, cache)
+        return list(hits[offset:offset + limit])
+    k = offset + limit if mode == "bm25" else TOP_K
+    hits = iter_hits(query, verses, embeddings_model, index, mode, k)
+    return list(islice(hits, offset, offset + limit))
 
-    for v in verses:
-        if v["id"] in MUQATTAAT_VERSES:
-            continue
 
-        score = embeddings_model.similarity(q_vec, v["embedding"])
-        if score >= SIMILARITY_THRESHOLD:
-            results.append({
-                **v,
-                "reason": "semantic",
-                "score": round(score * 100, 2)
-            })
+def hit_verse(hit, verses, index=None):
+    """The verse dict a hit points to (no copy)"""
+    return index.verses[hit.row] if index is not None else verses[hit.row]
 
+
+def search_verses(
+    query: str,
+    verses: list,
+    embeddings_model=None,
+    index=None,
+    mode="stages",
+    k=TOP_K
+):
+    """
+    index: optional SearchIndex over `verses` (search.index); without it
+    every stage scans the verse list.
+    mode: "stages" (exact -> root -> fuzzy -> semantic, every hit, unranked) or
+    "bm25" (the k most relevant verses, best first, with their score).
+    Materializes every hit as a verse dict; see iter_hits / search_page
+    for the streaming API.
+    """
+    results = []
+    for hit in iter_hits(query, verses, embeddings_model, index, mode, k):
+        result = {**hit_verse(hit, verses, index), "reason": hit.reason}
+        if hit.score is not None:
+            result["score"] = hit.score
+        if hit.positions is not None:
+            result["positions"] = hit.positions
+        results.append(result)
     return results
@@ -0,0 +1,118 @@
+import pickle
+from array import array
+from bisect import bisect_right
+
+SEPARATOR = "\n"  # never appears in a query, so matches cannot cross verses
+
+
+def build_suffix_array(text):
+    """
+    Suffix array by prefix doubling: after round k suffixes are sorted by
+    their first 2k characters; stop once every rank is distinct.
+    """
+    n = len(text)
+    if n == 0:
+        return array("I")
+    rank = [ord(c) for c in text]
+    sa = list(range(n))
+    k = 1
+    while True:
+        # One integer key per suffix: (rank[i], rank[i + k]) packed together
+        width = max(rank) + 2
+        keys = [rank[i] * width + (rank[i + k] + 1 if i + k < n else 0) for i in range(n)]
+        sa.sort(key=keys.__getitem__)
+
+        new_rank = [0] * n
+        r = 0
+        prev = keys[sa[0]]
+        for i in sa:
+            if keys[i] != prev:
+                r += 1
+                prev = keys[i]
+            new_rank[i] = r
+        rank = new_rank
+        if r == n - 1:
+            break
+        k *= 2
+    return array("I", sa)
+
+
+class SuffixArray:
+    """
+    Suffix array over the concatenated normalized texts (one per verse,
+    joined by a separator), with a mapping from corpus offsets back to
+    (row, offset in row). Counting and locating any substring - partial
+    words, cross-word phrases - takes two binary searches.
+    """
+
+    def __init__(self, texts, sa=None):
+        self.texts = texts
+        self.text = SEPARATOR.join(texts)
+        starts, pos = [], 0
+        for t in texts:
+            starts.append(pos)
+            pos += len(t) + len(SEPARATOR)
+        self.starts = array("I", starts)
+        self.sa = sa if sa is not None else build_suffix_array(self.text)
+
+    def _range(self, pattern):
+        """[lo, hi) block of the suffix array whose suffixes start with pattern"""
+        text, sa, m = self.text, self.sa, len(pattern)
+        lo, hi = 0, len(sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if text[sa[mid]:sa[mid] + m] < pattern:
+                lo = mid + 1
+            else:
+                hi = mid
+        start, hi = lo, len(sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if text[sa[mid]:sa[mid] + m] <= pattern:
+                lo = mid + 1
+            else:
+                hi = mid
+        return start, lo
+
+    def count(self, pattern):
+        """Number of occurrences of pattern in the corpus"""
+        if not pattern or SEPARATOR in pattern:
+            return 0
+        lo, hi = self._range(pattern)
+        return hi - lo
+
+    def positions(self, pattern):
+        """Sorted (row, offset) of every occurrence of pattern"""
+        if not pattern or SEPARATOR in pattern:
+            return []
+        lo, hi = self._range(pattern)
+        starts = self.starts
+        out = []
+        for pos in sorted(self.sa[lo:hi]):
+            row = bisect_right(starts, pos) - 1
+            out.append((row, pos - starts[row]))
+        return out
+
+    def rows(self, pattern):
+        """Sorted rows containing pattern, each mapped to its match offsets"""
+        hits = {}
+        for row, offset in self.positions(pattern):
+            hits.setdefault(row, []).append(offset)
+        return hits
+
+    # --- persistence ---
+    def save(self, path, version=None):
+        data = {"version": version, "size": len(self.texts), "sa": self.sa.tobytes()}
+        with open(path, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path, texts, version=None):
+        """Load a saved suffix array for `texts`; None if it was built for another corpus"""
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if data["version"] != version or data["size"] != len(texts):
+            return None
+        sa = array("I")
+        sa.frombytes(data["sa"])
+        return cls(texts, sa=sa)
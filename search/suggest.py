@@ -0,0 +1,70 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from search.text_normalizer import FULL_TABLE
+
+SUGGEST_K = 8
+PRECOMPUTED_PREFIX = 2  # top-k lists kept for every prefix up to this length
+
+
+def fold(text):
+    return text.translate(FULL_TABLE)
+
+
+class Suggester:
+    """
+    Search-as-you-type completions: the corpus vocabulary (fully folded
+    words) as one sorted array, with parallel frequency and spelling
+    arrays. A prefix is the contiguous block
+    [bisect(prefix), bisect(prefix + max char)); short prefixes, whose
+    blocks are large, have their top-k precomputed.
+    """
+
+    def __init__(self, counts, k=SUGGEST_K):
+        """counts: {corpus word: frequency}; words are matched by their folded form"""
+        folded, surface = Counter(), {}
+        for word, n in counts.items():
+            key = fold(word)
+            folded[key] += n
+            if n > counts.get(surface.get(key), 0):
+                surface[key] = word
+        self.words = sorted(folded)
+        self.freqs = array("I", (folded[w] for w in self.words))
+        # Completions are shown in their most frequent corpus spelling, which
+        # the exact stage finds as-is
+        self.surface = [surface[w] for w in self.words]
+        self.k = k
+        self._top = {}
+        for word in self.words:
+            for n in range(1, PRECOMPUTED_PREFIX + 1):
+                if len(word) >= n:
+                    self._top.setdefault(word[:n], None)
+        for prefix in self._top:
+            self._top[prefix] = self._rank(prefix, k)
+
+    @classmethod
+    def from_texts(cls, texts, k=SUGGEST_K):
+        return cls(Counter(w for text in texts for w in text.split()), k)
+
+    def _range(self, prefix):
+        lo = bisect_left(self.words, prefix)
+        return lo, bisect_left(self.words, prefix + "\U0010ffff", lo)
+
+    def _rank(self, prefix, k):
+        lo, hi = self._range(prefix)
+        freqs, surface = self.freqs, self.surface
+        best = heapq.nsmallest(k, range(lo, hi), key=lambda i: (-freqs[i], i))
+        return [(surface[i], freqs[i]) for i in best]
+
+    def suggest(self, prefix, k=None):
+        """Up to k (word, frequency) completions of prefix, most frequent first"""
+        k = k or self.k
+        prefix = fold(prefix).strip()
+        if not prefix:
+            return []
+        top = self._top.get(prefix)
+        if top is not None and k <= self.k:
+            return top[:k]
+        return self._rank(prefix, k)
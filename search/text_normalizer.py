@@ -1,10 +1,87 @@
-import re
+"""
+Arabic normalization profiles.
 
-ARABIC_DIACRITICS = re.compile(r"[ًٌٍَُِّْـ]")
+Every profile is a single str.translate table (one pass, one new string)
+instead of a regex sub followed by chained str.replace calls.
+"""
+
+HARAKAT = "".join(chr(c) for c in range(0x064B, 0x0653))          # tanween, fatha .. sukun
+TATWEEL = "ـ"
+EXTENDED_MARKS = "".join(chr(c) for c in range(0x0653, 0x0660))   # maddah, hamza above/below, ...
+SUPERSCRIPT_ALEF = "ٰ"
+QURANIC_ANNOTATIONS = "".join(chr(c) for c in range(0x06D6, 0x06EE))  # waqf signs, small letters
+QURANIC_MARKS = HARAKAT + EXTENDED_MARKS + SUPERSCRIPT_ALEF + QURANIC_ANNOTATIONS
+
+ALEF_VARIANTS = {"أ": "ا", "إ": "ا", "آ": "ا"}
+ALEF_WASLA = {"ٱ": "ا"}
+TA_MARBUTA = {"ة": "ه"}
+ALEF_MAQSURA = {"ى": "ي"}
+
+TABLE_SIZE = 0x0700  # ASCII .. end of the Arabic block
+
+def make_table(remove="", *mappings):
+    """
+    Build a translate table deleting `remove` and applying the char mappings.
+
+    The table is a dense list indexed by code point rather than a dict: a
+    dict raises (and swallows) a KeyError for every unmapped character,
+    which makes str.translate slower than the regex it replaces. Code
+    points past the list end are left unchanged by str.translate.
+    """
+    table = [chr(i) for i in range(TABLE_SIZE)]
+    for c in remove:
+        table[ord(c)] = ""
+    for mapping in mappings:
+        for k, v in mapping.items():
+            table[ord(k)] = v
+    return table
+
+SEARCH_TABLE = make_table(HARAKAT + TATWEEL, ALEF_VARIANTS, TA_MARBUTA, ALEF_MAQSURA)
+LEXICAL_TABLE = make_table(QURANIC_MARKS, ALEF_VARIANTS, TA_MARBUTA)
+SEMANTIC_TABLE = make_table(QURANIC_MARKS, ALEF_WASLA, ALEF_VARIANTS, TA_MARBUTA, ALEF_MAQSURA)
+FULL_TABLE = make_table(QURANIC_MARKS + TATWEEL, ALEF_WASLA, ALEF_VARIANTS, TA_MARBUTA, ALEF_MAQSURA)
 
 def normalize(text: str) -> str:
-    text = ARABIC_DIACRITICS.sub("", text)
-    text = text.replace("أ", "ا").replace("إ", "ا").replace("آ", "ا")
-    text = text.replace("ة", "ه")
-    text = text.replace("ى", "ي")
-    return text.strip()
+    return text.translate(SEARCH_TABLE).strip()
+
+def normalize_lexical(text: str) -> str:
+    """Root / keyword tools (quran_utils): all Quranic marks, keeps ى"""
+    return text.translate(LEXICAL_TABLE)
+
+def normalize_semantic(text: str) -> str:
+    """Embedding pipelines (quran_analyzer_v2, backend_builder)"""
+    return text.translate(SEMANTIC_TABLE).strip()
+
+def normalize_full(text: str) -> str:
+    """Everything folded: marks, tatweel, all alef forms, ة and ى"""
+    return text.translate(FULL_TABLE).strip()
+
+# Named profiles: the corpus snapshot stores one normalized column per profile
+PROFILES = {
+    "search": normalize,
+    "lexical": normalize_lexical,
+    "semantic": normalize_semantic,
+    "full": normalize_full,
+}
+
+TABLES = {
+    "search": SEARCH_TABLE,
+    "lexical": LEXICAL_TABLE,
+    "semantic": SEMANTIC_TABLE,
+    "full": FULL_TABLE,
+}
+
+STRIPPED = {"search", "semantic", "full"}
+
+def normalize_profile(text: str, profile: str = "search") -> str:
+    return PROFILES[profile](text)
+
+def normalize_many(texts, profile: str = "search") -> list:
+    """
+    Normalize a batch of texts with the profile's table bound once.
+    Output is identical to [PROFILES[profile](t) for t in texts].
+    """
+    table = TABLES[profile]
+    if profile in STRIPPED:
+        return [t.translate(table).strip() for t in texts]
+    return [t.translate(table) for t in texts]
@@ -0,0 +1,74 @@
+"""
+Exact cosine search over embedding rows (topics, verses, ...)
+
+Rows are L2-normalized float32, stored once, so cosine similarity is a
+plain dot product: one matrix-vector product per query, or one
+matrix-matrix product for a batch of queries. Top-k is selected with
+argpartition and only the k picked rows are sorted.
+
+    index = VectorIndex(vectors)
+    rows, scores = index.search(q_vec, k=5)
+    rows, scores = index.search_many(q_vecs, k=5)   # (len(q_vecs), k)
+"""
+
+import numpy as np
+
+
+def normalize_rows(vectors):
+    """float32 copy with unit-length rows (cosine = dot product)"""
+    vectors = np.array(vectors, dtype=np.float32, ndmin=2)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return vectors
+
+
+def top_k(scores, k):
+    """(rows, scores) of the k largest entries of each row of a 2-D array, best first"""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+    rows = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    picked = np.take_along_axis(scores, rows, axis=1)
+    order = np.argsort(-picked, axis=1, kind="stable")
+    return np.take_along_axis(rows, order, axis=1), np.take_along_axis(picked, order, axis=1)
+
+
+class VectorIndex:
+    """
+    normalized=True trusts the rows to be unit-length float32 already (the
+    verse matrix from verse_embeddings.py) and keeps them as given, so a
+    memory-mapped matrix is not copied.
+    """
+
+    def __init__(self, vectors, normalized=False):
+        self.vectors = vectors if normalized else normalize_rows(vectors)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    def scores(self, q_vec):
+        """Cosine similarity of one query vector against every row"""
+        return self.scores_many(q_vec)[0]
+
+    def scores_many(self, queries):
+        """(len(queries), n) cosine similarities, one matrix product"""
+        return normalize_rows(queries) @ self.vectors.T
+
+    def search(self, q_vec, k=5):
+        """(rows, cosine scores) of the k nearest rows, best first"""
+        rows, scores = self.search_many(q_vec, k)
+        return rows[0], scores[0]
+
+    def search_many(self, queries, k=5):
+        """(rows, scores), each (len(queries), k), best first per query"""
+        return top_k(self.scores_many(queries), k)
+
+    def above(self, q_vec, threshold):
+        """(rows, scores) of every row at or above threshold, in row order"""
+        scores = self.scores(q_vec)
+        rows = (scores >= threshold).nonzero()[0]
+        return rows, scores[rows]
@@ -2,15 +2,27 @@
 import numpy as np
 
 class StreamProcessor:
-    def __init__(self, ai_engine, threshold=0.65):
+    def __init__(self, ai_engine, threshold=0.65, batch_size=None):
         self.ai = ai_engine
         self.threshold = threshold # عتبة الفصل بين المواضيع
+        self.batch_size = batch_size # None = BATCH_SIZE الافتراضي في ai_engine
 
-    def process_surah(self, surah_name, verses):
+    def embed_verses(self, verses):
+        """متجهات كل آيات السورة دفعة واحدة (ترميز بالدفعات)"""
+        texts = [text for _, text in verses]
+        if self.batch_size is None:
+            return self.ai.embed_many(texts)
+        return self.ai.embed_many(texts, batch_size=self.batch_size)
+
+    def process_surah(self, surah_name, verses, vectors=None):
         """
         Input: قائمة آيات السورة
         Output: قائمة بالمواضيع المستخلصة (Local Topics)
+        vectors: متجهات الآيات إن كانت محسوبة مسبقاً (وإلا تُرمَّز السورة دفعة واحدة)
         """
+        if vectors is None:
+            vectors = self.embed_verses(verses)
+
         extracted_topics = []
         
         # الحالة الحالية للموضوع
@@ -20,9 +32,8 @@ class StreamProcessor:
             "centroid": None  # متوسط المتجهات للموضوع (Topic Vector)
         }
 
-        for ayah_num, text in verses:
-            # 1. فهم الآية الحالية
-            vec = self.ai.embed(text)
+        for (ayah_num, text), vec in zip(verses, vectors):
+            # 1. فهم الآية الحالية (متجهها محسوب مسبقاً)
 
             # 2. إذا كان هذا أول موضوع في السورة
             if not current_topic["verses"]:
@@ -0,0 +1,62 @@
+"""
+Multi-process corpus encoding: order, cache reuse, no pool when fully cached
+"""
+
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ai_engine import EncoderPool, encode_corpus
+from embedding_cache import EmbeddingCache
+
+
+class LengthEncoder:
+    """Deterministic stand-in for the model; rows record the worker pid"""
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        return np.array([[len(t), sum(map(ord, t)) % 97, os.getpid()] for t in texts], dtype=np.float32)
+
+
+def length_factory(model_name, backend, threads):
+    return LengthEncoder()
+
+
+def failing_factory(model_name, backend, threads):
+    raise AssertionError("the model must not be loaded")
+
+
+TEXTS = [f"{'ا' * (i % 13 + 1)} آية {i}" for i in range(200)]
+
+
+def test_pool_keeps_input_order():
+    with EncoderPool(processes=2, factory=length_factory) as pool:
+        vectors = pool.encode(TEXTS, batch_size=8)
+        single = pool.encode(TEXTS[5])
+    assert single.shape == (3,) and np.array_equal(single[:2], vectors[5][:2])
+
+    expected = LengthEncoder().encode(TEXTS)
+    assert vectors.shape == (200, 3)
+    assert np.array_equal(vectors[:, :2], expected[:, :2])
+    assert os.getpid() not in set(vectors[:, 2])  # encoded in the workers
+
+
+def test_encode_corpus_uses_and_fills_the_cache(tmp_path, capsys):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    first = encode_corpus(TEXTS, processes=2, model_name="fake", backend="torch",
+                          cache=cache, factory=length_factory)
+    assert len(cache) == len(set(TEXTS))
+    assert f"0 from the cache, {len(TEXTS)} encoded in" in capsys.readouterr().out
+
+    # Everything cached: same vectors, and no worker (or model) is started
+    again = encode_corpus(TEXTS, processes=2, model_name="fake", backend="torch",
+                          cache=cache, factory=failing_factory)
+    assert np.array_equal(first, again)
+    report = capsys.readouterr().out
+    assert f"{len(TEXTS)} from the cache, 0 encoded" in report and "verses/s" not in report
+
+    # Partly cached: the rate is over the misses only
+    encode_corpus(TEXTS + ["جديد 1", "جديد 2"], processes=2, model_name="fake", backend="torch",
+                  cache=cache, factory=length_factory)
+    assert f"{len(TEXTS)} from the cache, 2 encoded in" in capsys.readouterr().out
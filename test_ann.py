@@ -0,0 +1,108 @@
+"""
+Nearest-neighbour indexes: exact top-k, IVF recall, persistence
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from search import ann
+from search.ann import ExactIndex, IVFFlatIndex, build_index, load_index, load_or_build
+
+
+def clustered(n=6000, dim=32, clusters=60, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, n)] + 0.4 * rng.normal(size=(n, dim))
+    queries = vectors[rng.choice(n, 50, replace=False)] + 0.2 * rng.normal(size=(50, dim))
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+
+def test_exact_index_matches_full_sort():
+    vectors, queries = clustered(n=300)
+    index = ExactIndex(vectors)
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    for q in queries[:10]:
+        sims = unit @ (q / np.linalg.norm(q))
+        rows, scores = index.search(q, k=7)
+        assert rows.tolist() == np.argsort(-sims, kind="stable")[:7].tolist()
+        assert np.allclose(scores, sims[rows], atol=1e-6)
+    assert len(index.search(queries[0], k=1000)[0]) == 300
+
+
+def test_ivf_recall_grows_with_nprobe():
+    vectors, queries = clustered()
+    exact = ExactIndex(vectors)
+    ivf = IVFFlatIndex(vectors, nprobe=4)
+    assert ivf.nlist == int(np.sqrt(len(vectors)))
+    assert ivf.offsets[-1] == len(vectors)
+
+    def recall(nprobe):
+        found = 0
+        for q in queries:
+            truth = set(exact.search(q, 10)[0].tolist())
+            found += len(truth & set(ivf.search(q, 10, nprobe=nprobe)[0].tolist()))
+        return found / (10 * len(queries))
+
+    low, default, full = recall(1), recall(None), recall(ivf.nlist)
+    assert low <= default <= full == 1.0
+    assert default >= 0.9
+
+
+def test_small_collections_are_searched_exactly(monkeypatch):
+    vectors, queries = clustered(n=500)
+    monkeypatch.setattr(ann, "EXACT_BELOW", 10_000)
+    ivf = IVFFlatIndex(vectors, nprobe=1)
+    exact = ExactIndex(vectors)
+    for q in queries[:10]:
+        assert ivf.search(q, 5)[0].tolist() == exact.search(q, 5)[0].tolist()
+
+
+def test_save_load_and_version(tmp_path):
+    vectors, queries = clustered(n=5000)
+    for backend in ann.BACKENDS:
+        index = build_index(vectors, backend)
+        path = str(tmp_path / f"{backend}.npz")
+        index.save(path, version="v1")
+        loaded = load_index(path, version="v1")
+        assert type(loaded) is type(index)
+        assert loaded.search(queries[0], 5)[0].tolist() == index.search(queries[0], 5)[0].tolist()
+        assert load_index(path, version="v2") is None
+
+    with pytest.raises(ValueError):
+        build_index(vectors, "hnsw")
+
+
+def test_load_or_build_rebuilds_on_version_change(tmp_path):
+    vectors, _ = clustered(n=200)
+    path = str(tmp_path / "topics.ann.npz")
+    first = load_or_build(vectors, path, "a", backend="exact")
+    assert load_or_build(vectors, path, "a", backend="exact").kind == "exact"
+    rebuilt = load_or_build(vectors[:100], path, "b", backend="ivf")
+    assert (first.kind, rebuilt.kind, len(rebuilt)) == ("exact", "ivf", 100)
+    assert load_index(path, version="b").kind == "ivf"
+
+
+def test_load_or_build_follows_backend_and_params(tmp_path, monkeypatch):
+    vectors, _ = clustered(n=400)
+    path = str(tmp_path / "topics.ann.npz")
+    built = []
+
+    def recording_build(vectors, backend="ivf", **params):
+        built.append((backend, params))
+        return build_index(vectors, backend, **params)
+
+    monkeypatch.setattr(ann, "build_index", recording_build)
+
+    assert load_or_build(vectors, path, "a", backend="ivf").nlist == 20
+    assert load_or_build(vectors, path, "a", backend="ivf", nlist=20).nlist == 20  # same cells
+    assert load_or_build(vectors, path, "a", backend="ivf", nprobe=3).nprobe == 3  # query knob only
+    assert len(built) == 1
+
+    # The backend argument wins over the saved file
+    assert load_or_build(vectors, path, "a", backend="exact").kind == "exact"
+    assert load_or_build(vectors, path, "a", backend="ivf").kind == "ivf"
+    assert load_or_build(vectors, path, "a", backend="ivf", nlist=5).nlist == 5
+    assert load_or_build(vectors, path, "a", backend="ivf", nlist=5, seed=1).seed == 1
+    assert load_index(path, version="a").seed == 1
+    assert len(built) == 5
@@ -0,0 +1,151 @@
+"""
+Test the memory-mapped corpus snapshot
+"""
+
+from corpus import Corpus, build_snapshot
+from search.text_normalizer import PROFILES
+
+SAMPLE_SOURCE = [
+    {
+        "id": 1,
+        "name": "الفاتحة",
+        "verses": [
+            {"id": 1, "text": "بِسْمِ ٱللَّهِ ٱلرَّحْمَٰنِ ٱلرَّحِيمِ"},
+            {"id": 2, "text": "ٱلْحَمْدُ لِلَّهِ رَبِّ ٱلْعَٰلَمِينَ"},
+            {"id": 3, "text": "ٱلرَّحْمَٰنِ ٱلرَّحِيمِ"},
+        ],
+    },
+    {
+        "id": 112,
+        "name": "الإخلاص",
+        "verses": [
+            {"id": 1, "text": "قُلْ هُوَ ٱللَّهُ أَحَدٌ"},
+            {"id": 2, "text": "ٱللَّهُ ٱلصَّمَدُ"},
+        ],
+    },
+]
+
+
+def make_corpus(tmp_path):
+    path = str(tmp_path / "corpus.bin")
+    build_snapshot(SAMPLE_SOURCE, path)
+    return Corpus(path)
+
+
+def test_snapshot_roundtrip(tmp_path):
+    """Texts, refs and surah tables survive the binary snapshot"""
+    corpus = make_corpus(tmp_path)
+
+    assert len(corpus) == 5
+    assert corpus.text(1) == "ٱلْحَمْدُ لِلَّهِ رَبِّ ٱلْعَٰلَمِينَ"
+    assert corpus.ref(3) == "112:1"
+    assert corpus.surah_name(112) == "الإخلاص"
+    assert corpus.surah_range(112) == (3, 5)
+    assert [s[:2] for s in corpus.surahs()] == [(1, "الفاتحة"), (112, "الإخلاص")]
+
+    verses = corpus.verses()
+    assert verses[4]["id"] == "112:2"
+    assert (verses[4]["surah"], verses[4]["ayah"]) == (112, 2)
+    assert verses[4]["text"] == "ٱللَّهُ ٱلصَّمَدُ"
+
+
+def test_snapshot_version_tracks_content(tmp_path):
+    """The corpus version changes only when the text changes"""
+    a = build_snapshot(SAMPLE_SOURCE, str(tmp_path / "a.bin"))
+    b = build_snapshot(SAMPLE_SOURCE, str(tmp_path / "b.bin"))
+    edited = [dict(SAMPLE_SOURCE[0], verses=SAMPLE_SOURCE[0]["verses"][:2])]
+    c = build_snapshot(edited, str(tmp_path / "c.bin"))
+
+    assert a == b
+    assert a != c
+    assert Corpus(str(tmp_path / "a.bin")).version == a
+
+
+def test_verse_index_windows(tmp_path):
+    """Lookups are by ref and neighbour windows stay inside the surah"""
+    corpus = make_corpus(tmp_path)
+    index = corpus.verse_index()
+
+    assert index.get("1:2")["text"] == corpus.text(1)
+    assert index.get("2:1") is None
+    assert [v["id"] for v in index.surah_verses(112)] == ["112:1", "112:2"]
+
+    before, target, after = index.window("1:3", before=2, after=2)
+    assert [v["id"] for v in before] == ["1:1", "1:2"]
+    assert target["id"] == "1:3"
+    assert after == []
+
+    before, target, after = index.window("112:1", before=2, after=2)
+    assert before == []
+    assert [v["id"] for v in after] == ["112:2"]
+
+
+def test_normalized_profile_columns(tmp_path):
+    """Each named profile is stored once and matches the live normalizer"""
+    corpus = make_corpus(tmp_path)
+    texts = corpus.strings("text")
+
+    for profile, normalize in PROFILES.items():
+        assert corpus.normalized(profile) == [normalize(t) for t in texts]
+    assert corpus.verses()[0]["normalized"] == corpus.normalized("search")[0]
+
+
+def test_token_table_alignment(tmp_path):
+    """Tokens keep Uthmani words and normalized forms aligned, even around waqf signs"""
+    source = [{"id": 2, "name": "البقرة", "verses": [
+        {"id": 2, "text": "ذَٰلِكَ ٱلْكِتَٰبُ لَا رَيْبَ ۛ فِيهِ ۛ هُدًى لِّلْمُتَّقِينَ"},
+    ]}]
+    path = str(tmp_path / "tokens.bin")
+    build_snapshot(source, path)
+    corpus = Corpus(path)
+    tokens = corpus.tokens
+
+    assert len(tokens) == 9
+    assert list(tokens.verse_tokens(0)) == list(range(9))
+    assert tokens.uthmani_forms()[5] == "فِيهِ"
+    assert tokens.forms("lexical")[4] == ""  # standalone waqf sign
+    assert tokens.forms("lexical")[5] == "فيه"
+
+    for profile in PROFILES:
+        verse = corpus.normalized(profile)[0]
+        forms = tokens.forms(profile)
+        positions = tokens.positions(profile)
+        for i in range(len(tokens)):
+            assert verse[positions[i]:positions[i] + len(forms[i])] == forms[i]
+
+
+def test_load_corpus_rebuilds_stale_snapshot(tmp_path, monkeypatch):
+    """A snapshot from an older FORMAT_VERSION is rebuilt, not rejected"""
+    import corpus as corpus_module
+
+    path = str(tmp_path / "stale.bin")
+    build_snapshot(SAMPLE_SOURCE, path)
+    with open(path, "r+b") as f:
+        magic, fmt, toc_len = corpus_module.HEADER.unpack(f.read(corpus_module.HEADER.size))
+        f.seek(0)
+        f.write(corpus_module.HEADER.pack(magic, fmt - 1, toc_len))
+    assert not corpus_module.snapshot_is_current(path)
+
+    monkeypatch.setattr(corpus_module, "fetch_source", lambda: SAMPLE_SOURCE)
+    monkeypatch.setattr(corpus_module, "_OPEN", {})
+    corpus = corpus_module.load_corpus(path)
+    assert corpus_module.snapshot_is_current(path)
+    assert len(corpus) == 5
+
+
+def test_load_corpus_follows_a_replaced_snapshot(tmp_path, monkeypatch):
+    """Rebuilding the file is picked up by the next load_corpus call"""
+    import corpus as corpus_module
+
+    monkeypatch.setattr(corpus_module, "_OPEN", {})
+    path = str(tmp_path / "live.bin")
+    build_snapshot(SAMPLE_SOURCE, path)
+    first = corpus_module.load_corpus(path)
+    assert corpus_module.load_corpus(path) is first
+
+    edited = [dict(SAMPLE_SOURCE[0], verses=SAMPLE_SOURCE[0]["verses"][:2])]
+    build_snapshot(edited, path)
+    second = corpus_module.load_corpus(path)
+    assert second is not first
+    assert second.version != first.version
+    assert (len(first), len(second)) == (5, 2)  # the old mapping is still readable
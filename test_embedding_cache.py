@@ -0,0 +1,134 @@
+"""
+Embedding cache: content-addressed keys, bulk get/put, LRU eviction
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from embedding_cache import CachedEncoder, EmbeddingCache
+
+
+class FakeModel:
+    """Records every text it is asked to encode"""
+
+    def __init__(self):
+        self.seen = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        if isinstance(texts, str):
+            return self.encode([texts])[0]
+        self.seen.extend(texts)
+        return np.array([[len(t), t.count("ا"), 1.0] for t in texts], dtype=np.float32)
+
+    def similarity(self, a, b):
+        return "delegated"
+
+
+def test_bulk_get_put_and_keys(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    cache.put_many("m", ["بسم  الله", "الحمد"], [[1, 2], [3, 4]])
+
+    got = cache.get_many("m", ["الحمد", "بسم الله", "غائب"])
+    assert got[0].tolist() == [3, 4]
+    assert got[1].tolist() == [1, 2]  # whitespace-insensitive key
+    assert got[2] is None
+    assert cache.get_many("other-model", ["الحمد"]) == [None]
+    assert len(cache) == 2
+
+
+def test_cached_encoder_only_encodes_misses(tmp_path):
+    model = FakeModel()
+    encoder = CachedEncoder(model, "fake", EmbeddingCache(str(tmp_path / "cache.sqlite")))
+
+    first = encoder.encode(["الله", "رب", "الله"], batch_size=8)
+    assert model.seen == ["الله", "رب"]
+    second = encoder.encode(["رب", "الله", "العالمين"])
+    assert model.seen == ["الله", "رب", "العالمين"]
+    assert np.array_equal(first[1], second[0])
+    assert encoder.encode("رب").tolist() == [2, 0, 1]
+    assert encoder.similarity(None, None) == "delegated"
+
+    # A fresh process (new connection) reuses the persisted vectors
+    reopened = CachedEncoder(model, "fake", EmbeddingCache(str(tmp_path / "cache.sqlite")))
+    reopened.encode(["الله", "رب", "العالمين"])
+    assert len(model.seen) == 3
+
+
+def test_cached_encoder_encode_options(tmp_path):
+    class OptionsModel(FakeModel):
+        def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False):
+            self.progress = show_progress_bar
+            return super().encode(texts, batch_size, convert_to_numpy)
+
+    model = OptionsModel()
+    encoder = CachedEncoder(model, "fake", EmbeddingCache(str(tmp_path / "cache.sqlite")))
+
+    raw = encoder.encode(["الحمد", "رب"], show_progress_bar=True)
+    assert model.progress is True  # forwarded to the model for the misses
+    unit = encoder.encode(["الحمد", "رب"], normalize_embeddings=True)
+    assert np.allclose(np.linalg.norm(unit, axis=1), 1.0)
+    assert np.allclose(unit, raw / np.linalg.norm(raw, axis=1, keepdims=True))
+    assert np.allclose(encoder.encode("رب", normalize_embeddings=True), unit[1])
+    # The cache still holds the raw vectors
+    assert np.array_equal(encoder.encode(["الحمد", "رب"]), raw)
+
+    with pytest.raises(TypeError):
+        encoder.encode(["الحمد"], precision="int8")
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=3)
+    cache.put_many("m", ["a", "b", "c"], [[1], [2], [3]])
+    cache.get_many("m", ["c"])               # a and b are now the oldest
+    cache.put_many("m", ["d"], [[4]])        # 4 > 3: evict down to 2
+    assert len(cache) == 2
+    assert [v is not None for v in cache.get_many("m", ["a", "b", "c", "d"])] == [
+        False, False, True, True
+    ]
+
+
+def test_reads_do_not_write(tmp_path, monkeypatch):
+    import embedding_cache
+
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    cache.put_many("m", ["a", "b", "c"], [[1], [2], [3]])
+    written = cache._db.total_changes
+    for _ in range(5):
+        cache.get_many("m", ["a", "b", "غائب"])
+    assert cache._db.total_changes == written
+
+    # Hit timestamps are written in batches
+    monkeypatch.setattr(embedding_cache, "TOUCH_BATCH", 3)
+    cache.get_many("m", ["c"])
+    assert cache._db.total_changes == written + 3
+
+
+def test_encode_query_lru_counts_avoided_encodes():
+    from embedding_cache import encode_query
+    from search.query_cache import QueryCache
+
+    model = FakeModel()
+    cache = QueryCache(maxsize=8)
+    first = encode_query(model, "  الصبر  ", cache)
+    again = encode_query(model, "الصبر", cache)
+
+    assert model.seen == ["الصبر"]
+    assert again is first and not first.flags.writeable
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_encode_query_keeps_entries_of_every_model():
+    from embedding_cache import encode_query
+    from search.query_cache import QueryCache
+
+    torch_model, onnx_model = FakeModel(), FakeModel()
+    torch_model.model_name, onnx_model.model_name = "m", "m#onnx-int8"
+    cache = QueryCache(maxsize=8)
+    for _ in range(3):
+        for model in (torch_model, onnx_model):
+            encode_query(model, "الصبر", cache)
+
+    # Alternating encoders: one encode each, then hits only
+    assert torch_model.seen == onnx_model.seen == ["الصبر"]
+    assert cache.stats()["hits"] == 4 and len(cache) == 2
@@ -0,0 +1,68 @@
+"""
+int8 ONNX encoder: cosine parity with the PyTorch model, mixed-backend guard
+
+The parity tests are skipped unless onnxruntime, tokenizers and
+sentence-transformers are installed; the first run exports the model into
+a temporary directory.
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import onnx_encoder
+from onnx_encoder import MODEL_NAME, OnnxEncoder, cache_name, export, query_backend
+
+TEXTS = [
+    "بسم الله الرحمن الرحيم",
+    "الحمد لله رب العالمين",
+    "واصبر وما صبرك إلا بالله",
+    "إن مع العسر يسرا",
+    "الصبر",
+    "قصة موسى وفرعون",
+]
+
+
+def test_mixed_backends_are_refused(monkeypatch, capsys):
+    monkeypatch.setattr(onnx_encoder, "resolve_backend", lambda backend=None: backend or "onnx")
+    assert query_backend("onnx") == "onnx"
+    assert query_backend("onnx", vectors_backend="onnx") == "onnx"
+    assert capsys.readouterr().out == ""
+    # int8 queries against torch-built vectors: torch is used, with a warning
+    assert query_backend("onnx", vectors_backend="torch") == "torch"
+    assert query_backend(None, vectors_backend="torch") == "torch"
+    assert "not comparable" in capsys.readouterr().out
+
+
+@pytest.fixture(scope="module")
+def encoders(tmp_path_factory):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("tokenizers")
+    sentence_transformers = pytest.importorskip("sentence_transformers")
+    path = export(MODEL_NAME, str(tmp_path_factory.mktemp("onnx")))
+    return sentence_transformers.SentenceTransformer(MODEL_NAME, device="cpu"), OnnxEncoder(path)
+
+
+def unit(m):
+    m = np.asarray(m, dtype=np.float32)
+    return m / np.linalg.norm(m, axis=-1, keepdims=True)
+
+
+def test_vectors_match_torch(encoders):
+    torch_model, onnx_model = encoders
+    ref, new = unit(torch_model.encode(TEXTS)), unit(onnx_model.encode(TEXTS, batch_size=4))
+    assert new.shape == ref.shape
+    assert (ref * new).sum(axis=1).min() > 0.97
+
+
+def test_cosine_scores_match_torch(encoders):
+    torch_model, onnx_model = encoders
+    ref, new = unit(torch_model.encode(TEXTS)), unit(onnx_model.encode(TEXTS))
+    assert np.abs(ref @ ref.T - new @ new.T).max() < 0.05
+
+
+def test_single_text_and_order(encoders):
+    _, onnx_model = encoders
+    batch = onnx_model.encode(TEXTS, batch_size=2)  # length-sorted internally
+    assert np.allclose(onnx_model.encode(TEXTS[3]), batch[3], atol=1e-4)
+    assert cache_name(MODEL_NAME, "onnx") != cache_name(MODEL_NAME, "torch")
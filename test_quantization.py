@@ -0,0 +1,51 @@
+"""
+Reduced-precision vector storage: scoring kernels and recall vs float32
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from quantization import CompactVectors, compact_path, compress
+
+
+def sample(n=500, dim=48, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, dim)).astype(np.float32), rng.normal(size=(20, dim)).astype(np.float32)
+
+
+@pytest.mark.parametrize("fmt,nbytes_ratio,tol", [
+    ("float32", 1.0, 1e-5), ("float16", 0.5, 2e-2), ("int8", 0.25 + 4 / 48 / 4, 5e-2)
+])
+def test_compact_scores_match_float32(fmt, nbytes_ratio, tol):
+    matrix, queries = sample()
+    compact = compress(matrix, fmt)
+    exact = queries @ matrix.T
+
+    assert compact.nbytes == pytest.approx(matrix.nbytes * nbytes_ratio)
+    approx = compact.scores_many(queries)
+    assert np.abs(approx - exact).max() / np.abs(exact).max() < tol
+    assert np.allclose(compact.scores(queries[0]), approx[0], atol=1e-4)
+
+    rows, scores = compact.top_k_many(queries, k=10)
+    truth = np.argsort(-exact, axis=1)[:, :10]
+    recall = np.mean([len(set(r) & set(t)) / 10 for r, t in zip(rows, truth)])
+    assert recall >= 0.9
+    assert (np.diff(scores, axis=1) <= 0).all()
+
+
+def test_int8_roundtrip_and_persistence(tmp_path):
+    matrix, _ = sample(50)
+    compact = compress(matrix, "int8", version="abc")
+    assert np.abs(compact.to_float32() - matrix).max() <= compact.scale.max() / 2 + 1e-6
+
+    path = compact_path(str(tmp_path / "topic_embeddings.pkl"), "int8")
+    assert path.endswith("topic_embeddings.int8.npz")
+    compact.save(path)
+    loaded = CompactVectors.load(path)
+    assert loaded.fmt == "int8" and loaded.version == "abc"
+    assert np.array_equal(loaded.data, compact.data)
+    assert np.array_equal(loaded.scale, compact.scale)
+
+    with pytest.raises(ValueError):
+        compress(matrix, "int4")
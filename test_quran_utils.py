@@ -0,0 +1,43 @@
+"""
+Test the lazy corpus accessor in quran_utils
+"""
+
+import importlib
+import sys
+import threading
+
+import quran_utils
+from test_corpus import make_corpus
+
+
+def test_corpus_loads_lazily_once(tmp_path, monkeypatch):
+    """Nothing is loaded at import; concurrent first accesses load once"""
+    import corpus as corpus_module
+
+    corpus = make_corpus(tmp_path)
+    calls = []
+
+    def fake_load_corpus():
+        calls.append(1)
+        return corpus
+
+    # A fresh import of the module loads nothing
+    monkeypatch.setattr(corpus_module, "load_corpus", fake_load_corpus)
+    monkeypatch.delitem(sys.modules, "quran_utils")
+    fresh = importlib.import_module("quran_utils")
+    assert fresh._QURAN_DATA is None and fresh._SEARCH_INDEX is None
+    assert calls == []
+
+    monkeypatch.setattr(quran_utils, "_QURAN_DATA", None)
+    monkeypatch.setattr(quran_utils, "load_corpus", fake_load_corpus)
+
+    threads = [threading.Thread(target=quran_utils.get_quran_data) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    data = quran_utils.QURAN_DATA
+    assert data[0]["ref"] == "الفاتحة (1:1)"
+    assert data[3]["normalized"] == quran_utils.normalize_text(data[3]["uthmani"])
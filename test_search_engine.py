@@ -0,0 +1,206 @@
+"""
+Test the search_engine stage cascade, operators and paging API
+(data.muqattaat is stubbed: the package is not part of this tree)
+"""
+
+import importlib
+import itertools
+import sys
+import types
+
+import pytest
+
+from search.index import SearchIndex
+from test_corpus import make_corpus
+
+MUQATTAAT = {"112:1"}
+MODEL_IDS = itertools.count()
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    muqattaat = types.ModuleType("data.muqattaat")
+    muqattaat.MUQATTAAT_VERSES = MUQATTAAT
+    data = types.ModuleType("data")
+    data.muqattaat = muqattaat
+    monkeypatch.setitem(sys.modules, "data", data)
+    monkeypatch.setitem(sys.modules, "data.muqattaat", muqattaat)
+    monkeypatch.delitem(sys.modules, "search.search_engine", raising=False)
+    return importlib.import_module("search.search_engine")
+
+
+@pytest.fixture
+def corpus_index(tmp_path):
+    corpus = make_corpus(tmp_path)
+    return corpus.verses(), SearchIndex.from_corpus(corpus)
+
+
+class FakeModel:
+    """One-hot "embeddings": only verse 1:3 is similar to any query"""
+
+    def __init__(self):
+        self.calls = []
+        self.model_name = f"fake-{next(MODEL_IDS)}"  # own entries in the shared query-vector LRU
+
+    def encode(self, text):
+        self.calls.append(text)
+        return [1.0, 0.0]
+
+
+def with_embeddings(verses):
+    return [dict(v, embedding=[1.0, 0.0] if v["id"] == "1:3" else [0.0, 1.0]) for v in verses]
+
+
+def reasons(hits):
+    return [(h.id, h.reason) for h in hits]
+
+
+def test_stages_stop_at_first_non_empty(engine, corpus_index):
+    verses, index = corpus_index
+    model = FakeModel()
+    for idx in (index, None):
+        # exact: the semantic model is never consulted
+        assert reasons(engine.iter_hits("حمد", verses, model, idx)) == [("1:2", "exact")]
+        # no substring, but the root matches
+        assert reasons(engine.iter_hits("رحمه", verses, model, idx)) == [("1:1", "root"), ("1:3", "root")]
+    assert model.calls == []
+
+    # typo: only the index has the fuzzy stage
+    assert reasons(engine.iter_hits("الصمط", verses, model, index)) == [("112:2", "fuzzy")]
+
+    # nothing lexical: semantic, through the verse-dict vectors
+    semantic = list(engine.iter_hits("زخرف", with_embeddings(verses), model))
+    assert reasons(semantic) == [("1:3", "semantic")]
+    assert semantic[0].score == 100.0
+    assert model.calls == ["زخرف"]
+
+
+def test_verse_dict_vectors_are_indexed_once(engine, corpus_index):
+    verses, _ = corpus_index
+    index = SearchIndex(with_embeddings(verses))  # no verse matrix
+    model = FakeModel()
+    for _ in range(2):
+        assert reasons(engine.iter_hits("زخرف", index.verses, model, index)) == [("1:3", "semantic")]
+    vectors = index.vector_index
+    assert vectors is not None and len(vectors) == len(verses)
+    assert reasons(engine.iter_hits("زخارف", index.verses, model, index)) == [("1:3", "semantic")]
+    assert index.vector_index is vectors
+
+    # No vectors at all: no semantic hits
+    assert list(engine.iter_hits("زخرف", verses, model, SearchIndex(verses))) == []
+
+
+def test_semantic_query_uses_the_verse_profile(engine, corpus_index):
+    verses, _ = corpus_index
+    model = FakeModel()
+    list(engine.iter_hits("زُخْرُفٌ", with_embeddings(verses), model))
+    assert model.calls == ["زخرف"]  # diacritics off, as for the verse vectors
+
+
+def test_muqattaat_are_excluded(engine, corpus_index):
+    verses, index = corpus_index
+    for idx in (index, None):
+        ids = [h.id for h in engine.iter_hits("احد", verses, index=idx)]
+        assert "112:1" not in ids
+
+
+def test_empty_query_has_no_hits(engine, corpus_index):
+    verses, index = corpus_index
+    model = FakeModel()
+    for query in ("", "   "):
+        for idx in (index, None):
+            for mode in ("stages", "bm25"):
+                assert list(engine.iter_hits(query, verses, model, idx, mode)) == []
+    assert model.calls == []
+
+
+def test_positional_operators(engine, corpus_index):
+    verses, index = corpus_index
+    phrase = list(engine.iter_hits('"لله رب"', verses, index=index))
+    assert reasons(phrase) == [("1:2", "phrase")]
+    assert phrase[0].positions == [1]
+    near = list(engine.iter_hits("الرحيم NEAR/3 بسم", verses))  # no index: built on demand
+    assert reasons(near) == [("1:1", "near")]
+
+
+def test_search_page_slices_the_hit_stream(engine, corpus_index):
+    verses, index = corpus_index
+    for mode in ("stages", "bm25"):
+        everything = list(engine.iter_hits("الرحيم", verses, index=index, mode=mode, k=50))
+        assert len(everything) >= 2
+        for offset in range(len(everything) + 1):
+            for limit in (1, 2, 5):
+                expected = everything[offset:offset + limit]
+                assert engine.search_page("الرحيم", verses, index=index, mode=mode,
+                                          limit=limit, offset=offset) == expected
+                cache = engine.QueryCache()
+                assert engine.search_page("الرحيم", verses, index=index, mode=mode,
+                                          limit=limit, offset=offset, cache=cache) == expected
+
+
+def test_search_verses_matches_hits(engine, corpus_index):
+    verses, index = corpus_index
+    for query, mode in (("رحمه", "stages"), ("الرحيم", "bm25"), ('"لله رب"', "stages")):
+        hits = list(engine.iter_hits(query, verses, index=index, mode=mode))
+        results = engine.search_verses(query, verses, index=index, mode=mode)
+        assert [r["id"] for r in results] == [h.id for h in hits]
+        for r, h in zip(results, hits):
+            assert r["reason"] == h.reason
+            assert r.get("score") == h.score
+            assert r.get("positions") == h.positions
+            assert r["text"] == index.verses[h.row]["text"]
+
+
+def test_cache_stores_bounded_blocks(engine, corpus_index, monkeypatch):
+    verses, index = corpus_index
+    monkeypatch.setattr(engine, "RANK_DEPTH", 2)
+    cache = engine.QueryCache()
+    everything = list(engine.iter_hits("ل", verses, index=index))
+    assert len(everything) > 3
+
+    assert engine.search_page("ل", verses, index=index, limit=1, offset=1, cache=cache) == everything[1:2]
+    assert [len(hits) for hits in cache._data.values()] == [2]
+    assert engine.search_page("ل", verses, index=index, limit=2, offset=2, cache=cache) == everything[2:4]
+    assert sorted(len(hits) for hits in cache._data.values()) == [2, 4]
+
+
+def test_cache_follows_a_rebuilt_snapshot(engine, tmp_path, monkeypatch):
+    import corpus as corpus_module
+    from corpus import build_snapshot
+    from test_corpus import SAMPLE_SOURCE
+
+    monkeypatch.setattr(corpus_module, "_OPEN", {})
+    path = str(tmp_path / "live.bin")
+    build_snapshot(SAMPLE_SOURCE, path)
+    cache = engine.QueryCache()
+
+    def search():
+        corpus = corpus_module.load_corpus(path)
+        index = SearchIndex(corpus.verses(), version=corpus.version)
+        return [h.id for h in engine.search_page("الرحيم", index.verses, index=index, cache=cache)]
+
+    assert search() == ["1:1", "1:3"]
+    build_snapshot([dict(SAMPLE_SOURCE[0], verses=SAMPLE_SOURCE[0]["verses"][:2])], path)
+    assert search() == ["1:1"]
+    assert cache.stats()["misses"] == 2
+
+
+def test_adhoc_index_builds_only_what_the_query_needs(engine, corpus_index, monkeypatch):
+    verses, _ = corpus_index
+    created = []
+
+    class Recording(SearchIndex):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(engine, "SearchIndex", Recording)
+
+    def built(index):
+        names = ("ngrams", "roots", "fuzzy", "bm25", "positional", "suffixes")
+        return [name for name in names if getattr(index, name) is not None]
+
+    assert [h.id for h in engine.iter_hits("الرحيم", verses, mode="bm25")]
+    assert built(created[-1]) == ["bm25"]
+    assert [h.id for h in engine.iter_hits('"لله رب"', verses)] == ["1:2"]
+    assert built(created[-1]) == ["positional"]
@@ -0,0 +1,289 @@
+"""
+Test the search package indexes against brute-force scans
+"""
+
+import os
+
+from search.index import SearchIndex, index_path
+from search.ngram_index import NgramIndex
+from search.suffix_array import SuffixArray, build_suffix_array
+from test_corpus import make_corpus
+
+QUERIES = ["الله", "الرحيم", "لله رب", "ا", "هو", "غير موجود", "صمد"]
+
+
+def test_ngram_search_matches_scan(tmp_path):
+    """Posting intersection + verification equals a substring scan"""
+    corpus = make_corpus(tmp_path)
+    texts = corpus.normalized("search")
+    index = NgramIndex(texts)
+
+    for q in QUERIES:
+        assert index.search(q) == [i for i, t in enumerate(texts) if q in t], q
+
+
+def test_search_index_from_corpus(tmp_path):
+    """SearchIndex persists its suffix array next to the snapshot; no n-gram index is built"""
+    corpus = make_corpus(tmp_path)
+    index = SearchIndex.from_corpus(corpus)
+
+    assert os.path.exists(str(tmp_path / "corpus_suffixes.pkl"))
+    assert not os.path.exists(str(tmp_path / "corpus_ngrams.pkl"))
+    assert index.ngrams is None
+    assert [index.verses[i]["id"] for i in index.exact("رحيم")] == ["1:1", "1:3"]
+    assert SearchIndex.from_corpus(corpus).exact("صمد") == [4]
+
+
+def test_suffix_array_counts_and_positions(tmp_path):
+    """Every occurrence, including cross-word phrases, maps back to (verse, offset)"""
+    corpus = make_corpus(tmp_path)
+    texts = corpus.normalized("search")
+    sa = SuffixArray(texts)
+
+    text = sa.text
+    assert list(sa.sa) == sorted(range(len(text)), key=lambda i: text[i:])
+    for q in QUERIES + ["م ٱ", "ه ا"]:
+        expected = [
+            (row, j)
+            for row, t in enumerate(texts)
+            for j in range(len(t))
+            if t.startswith(q, j)
+        ]
+        assert sa.positions(q) == expected, q
+        assert sa.count(q) == len(expected), q
+    assert sa.count("\n") == 0
+    assert list(build_suffix_array("banana")) == [5, 3, 1, 0, 4, 2]
+
+
+def test_exact_stage_uses_suffix_array(tmp_path):
+    """from_corpus loads the suffix array; exact() and occurrences() agree with the n-grams"""
+    corpus = make_corpus(tmp_path)
+    index = SearchIndex.from_corpus(corpus)
+    reloaded = SearchIndex.from_corpus(corpus)
+
+    assert index.suffixes is not None
+    for q in QUERIES:
+        assert index.exact(q) == NgramIndex(index.texts).search(q) == reloaded.exact(q), q
+    assert index.ngrams is None
+
+    # Without a suffix array the n-grams are built on first use
+    plain = SearchIndex(index.verses)
+    assert plain.ngrams is None
+    assert plain.exact("رحيم") == index.exact("رحيم")
+    assert plain.ngrams is not None
+    assert index.occurrences("رحيم") == {
+        0: [index.texts[0].index("رحيم")],
+        2: [index.texts[2].index("رحيم")],
+    }
+
+
+def test_extract_root_samples():
+    """The light stemmer reduces common derived forms to their root"""
+    from search.root_matcher import extract_root, query_root
+
+    assert extract_root("ٱلْحَمْدُ") == "حمد"
+    assert extract_root("يعلمون") == "علم"
+    assert extract_root("الكتاب") == "كتب"
+    assert extract_root("ٱلرَّحِيمِ") == "رحم"
+    assert extract_root("في") == ""
+    assert query_root("أحد") == "احد"
+
+    # One-letter proclitics (و ف ب ل ك س) are judged on the suffix-free stem
+    samples = {
+        "كفروا": "كفر", "كذبوا": "كذب", "كسبوا": "كسب", "سجدوا": "سجد", "لبثوا": "لبث",
+        "بلغوا": "بلغ", "كتبوا": "كتب", "كافرين": "كفر", "ساجدين": "سجد",
+        "لمساجد": "سجد", "لقومه": "قوم", "بربهم": "ربب",
+        "وجدوا": "وجد", "وجدنا": "وجد", "وعدنا": "وعد", "ولدا": "ولد", "فتحنا": "فتح",
+        "فضله": "فضل", "فاسقين": "فسق", "وجوه": "وجه", "فرعون": "فرعن",
+        "ووجدك": "وجد", "فقالوا": "قول", "وهم": "",
+    }
+    assert {w: extract_root(w) for w in samples} == samples
+    # Hamza seats, broken plurals and weak last letters
+    samples = {
+        "المؤمنين": "امن", "مؤمن": "امن", "يؤمنون": "امن", "آمنوا": "امن",
+        "الأنهار": "نهر", "الصلاة": "صلو", "جنات": "جنن",
+        "يهدي": "هدي", "الهدى": "هدي", "فهدى": "هدي",
+    }
+    assert {w: extract_root(w) for w in samples} == samples
+    assert extract_root("سألوا") == extract_root("يسئلون") == query_root("سأل")
+    assert query_root("كفر") == "كفر"
+
+
+def test_root_index_recall_over_the_regex_scan():
+    """
+    The root index finds every verse the old per-verse regex scan found
+    (root letters in order inside one word), on real verses
+    """
+    import re
+
+    from search.root_matcher import RootIndex
+    from search.text_normalizer import normalize
+
+    verses = [
+        "ووجدك ضالا فهدى",
+        "إنا فتحنا لك فتحا مبينا",
+        "جزاؤهم عند ربهم جنات عدن تجري من تحتها الأنهار خالدين فيها أبدا "
+        "رضي الله عنهم ورضوا عنه ذلك لمن خشي ربه",
+        "قد أفلح المؤمنون",
+        "الذين يؤمنون بالغيب ويقيمون الصلاة ومما رزقناهم ينفقون",
+        "ويقولون متى هذا الوعد إن كنتم صادقين",
+        "وما وجدنا لأكثرهم من عهد وإن وجدنا أكثرهم لفاسقين",
+        "لم يلد ولم يولد",
+        "ذلك فضل الله يؤتيه من يشاء والله ذو الفضل العظيم",
+        "ذلك الكتاب لا ريب فيه هدى للمتقين",
+        "وجوه يومئذ مسفرة",
+    ]
+    texts = [normalize(v) for v in verses]
+    roots = RootIndex.from_texts(texts)
+    for root in ("وجد", "وعد", "ولد", "فتح", "فضل", "فسق", "وجه", "امن", "نهر", "هدي"):
+        pattern = re.compile(rf"\w*{root[0]}\w*{root[1]}\w*{root[2]}\w*")
+        scanned = {i for i, text in enumerate(texts) if pattern.search(text)}
+        assert scanned, root
+        assert scanned <= set(roots.verses(root)), root
+    assert roots.verses("جنن") == [2] and roots.verses("صلو") == [4]
+
+
+def test_root_index_from_corpus(tmp_path):
+    """Root postings from the snapshot's tok_root column agree with root_match"""
+    from search.root_matcher import RootIndex, root_match
+
+    corpus = make_corpus(tmp_path)
+    roots = RootIndex.from_corpus(corpus)
+    index = SearchIndex.from_corpus(corpus)
+
+    assert roots.verses("رحم") == [0, 2]
+    assert index.root_rows("حمد") == [1]
+    for query in ("رحم", "حمد", "صمد", "الله"):
+        expected = [i for i, text in enumerate(index.texts) if root_match(query, text)]
+        assert index.root_rows(query) == expected
+
+
+def test_multi_matcher_agrees_with_substring_scan(tmp_path, monkeypatch):
+    """Aho-Corasick rows (automaton and scan fallback) match per-keyword `in`"""
+    import search.multi_matcher as mm
+
+    corpus = make_corpus(tmp_path)
+    texts = corpus.normalized("search")
+    keywords = ["لله", "رحيم", "صمد", "غير موجود", "هو"]
+    expected = {}
+    for pid, kw in enumerate(keywords):
+        rows = [i for i, text in enumerate(texts) if kw in text]
+        if rows:
+            expected[pid] = rows
+
+    automaton = mm.MultiMatcher(keywords)
+    assert automaton.rows(texts) == expected
+    assert automaton._automaton is None  # the scan never builds the automaton
+    monkeypatch.setattr(mm, "SCAN_THRESHOLD", 0)
+    assert automaton.rows(texts) == expected
+    assert automaton._automaton is not None
+
+    assert list(mm.MultiMatcher(["he", "she", "hers"]).iter_matches("ushers")) == [
+        (4, 1), (4, 0), (6, 2)
+    ]
+    assert mm.matcher(["صمد"]) is mm.matcher(["صمد"])
+
+
+def test_bm25_top_k(tmp_path):
+    """BM25 keeps k rows, best first, and survives persistence"""
+    from search.bm25 import BM25, terms
+
+    corpus = make_corpus(tmp_path)
+    index = SearchIndex.from_corpus(corpus)
+    bm25 = index.bm25
+
+    assert terms("الرحيم والرحمن لله") == ["رحيم", "رحمن", "لله"]
+    ranked = bm25.top_k("رحيم", k=10)
+    assert [row for row, _ in ranked] == [2, 0]  # shorter verse first
+    assert ranked[0][1] > ranked[1][1]
+    assert bm25.top_k("الله", k=1) == bm25.top_k("الله", k=10)[:1]
+    assert bm25.top_k("رحيم", exclude={2}) == [(0, ranked[1][1])]
+    assert bm25.top_k("غير موجود") == []
+
+    reloaded = BM25.load(index_path(corpus, "bm25"), index.texts, version=corpus.version)
+    assert reloaded.top_k("الله", k=5) == bm25.top_k("الله", k=5)
+
+
+def test_query_cache_lru_and_invalidation():
+    """Hits/misses are counted, the LRU evicts, and a new corpus version clears it"""
+    from search.query_cache import QueryCache
+
+    cache = QueryCache(maxsize=2)
+    calls = []
+    compute = lambda key: (lambda: calls.append(key) or (key,))
+
+    assert cache.get_or_compute("a", "v1", compute("a")) == ("a",)
+    assert cache.get_or_compute("a", "v1", compute("a")) == ("a",)
+    cache.get_or_compute("b", "v1", compute("b"))
+    cache.get_or_compute("a", "v1", compute("a"))   # a is now most recent
+    cache.get_or_compute("c", "v1", compute("c"))   # evicts b
+    cache.get_or_compute("b", "v1", compute("b"))
+    assert calls == ["a", "b", "c", "b"]
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 4
+
+    cache.get_or_compute("a", "v2", compute("a"))   # snapshot changed
+    assert calls[-1] == "a" and len(cache) == 1
+    assert cache.stats()["version"] == "v2"
+
+
+def test_fuzzy_index_tolerates_typos(tmp_path):
+    """Symmetric-delete lookups agree with a brute-force edit-distance scan"""
+    from search.fuzzy_index import FuzzyIndex, edit_distance
+
+    corpus = make_corpus(tmp_path)
+    index = SearchIndex.from_corpus(corpus)
+    fuzzy = FuzzyIndex(index.texts)
+
+    assert edit_distance("رحيم", "رحيم") == 0
+    assert edit_distance("رحيم", "رخيم") == 1
+    assert edit_distance("رحمن", "رمحن") == 1  # adjacent swap
+    assert edit_distance("صمد", "حمدلله") == 3  # capped at limit + 1
+
+    for word in ("رخيم", "رحمان", "عالمين", "صمدد", "احد"):
+        expected = sorted(
+            (w, edit_distance(word, w)) for w in fuzzy.words
+            if edit_distance(word, w) <= 1
+        )
+        assert sorted(fuzzy.lookup(word, max_distance=1)) == expected, word
+
+    assert index.fuzzy_rows("رخيم") == [(0, 1), (2, 1)]
+    assert index.fuzzy_rows("الصمت") == [(4, 1)]
+    assert index.fuzzy_rows("غير موجود") == []
+
+
+def test_positional_phrase_and_near(tmp_path):
+    """Phrase and NEAR queries over (verse, word position) postings"""
+    from search.positional_index import PositionalIndex, parse_query
+
+    corpus = make_corpus(tmp_path)
+    index = SearchIndex.from_corpus(corpus)
+    positional = index.positional
+
+    assert positional.postings == PositionalIndex.from_texts(index.texts).postings
+    assert parse_query('"رَبِّ ٱلْعَٰلَمِينَ"') == ("phrase", ["رب", "علمين"])
+    assert parse_query("الله near/2 احد") == ("near", ["الله", "احد"], 2)
+    assert parse_query("الرحمن الرحيم") is None
+
+    assert index.phrase(["رحمن", "رحيم"]) == {0: [2], 2: [0]}
+    assert index.phrase(["رحيم", "رحمن"]) == {}
+    assert index.phrase(["لله", "رب", "علمين"]) == {1: [1]}
+    assert index.near("الله", "احد", 2) == {3: [(2, 3)]}
+    assert index.near("قل", "احد", 2) == {}
+    assert index.near("قل", "احد", 3) == {3: [(0, 3)]}
+
+
+def test_suggest_prefix_completions(tmp_path):
+    """Completions are ranked by frequency, diacritic-insensitive, in corpus spelling"""
+    from search.suggest import Suggester
+
+    corpus = make_corpus(tmp_path)
+    index = SearchIndex.from_corpus(corpus)
+
+    assert index.suggest("الل") == [("ٱلله", 3)]
+    assert index.suggest("ٱلرَّ", 5) == [("ٱلرحمٰن", 2), ("ٱلرحيم", 2)]
+    assert [w for w, _ in index.suggest("ا")][:1] == ["ٱلله"]
+    assert index.suggest("زز") == [] and index.suggest("") == []
+
+    suggester = Suggester({"كتب": 3, "كتاب": 5, "كتبه": 1}, k=2)
+    assert suggester.suggest("كت") == [("كتاب", 5), ("كتب", 3)]
+    assert suggester.suggest("كتب", 5) == [("كتب", 3), ("كتبه", 1)]
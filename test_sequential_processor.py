@@ -0,0 +1,63 @@
+"""
+StreamProcessor: batched encoding gives the same topics as per-ayah encoding
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from sequential_processor import StreamProcessor
+
+
+class CountingEngine:
+    """Letter-histogram vectors; counts model calls like a real encoder would cost"""
+
+    def __init__(self):
+        self.single_calls = 0
+        self.batch_calls = 0
+
+    @staticmethod
+    def _vector(text):
+        vec = np.zeros(32, dtype=np.float32)
+        for c in text:
+            vec[ord(c) % 32] += 1
+        return vec
+
+    def embed(self, text):
+        self.single_calls += 1
+        return self._vector(text)
+
+    def embed_many(self, texts, batch_size=64):
+        self.batch_calls += -(-len(texts) // batch_size)
+        return np.stack([self._vector(t) for t in texts])
+
+    def similarity(self, v1, v2):
+        return float(np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2)))
+
+
+VERSES = [(1, "اب اب اب"), (2, "اب اب"), (3, "سش سش"), (4, "سش"), (5, "اب")]
+
+
+def test_batched_topics_match_per_ayah():
+    engine = CountingEngine()
+    batched = StreamProcessor(engine, threshold=0.9, batch_size=2)
+
+    # The batched vectors are the ones embed() gives one verse at a time
+    vectors = [engine.embed(text) for _, text in VERSES]
+    assert engine.single_calls == len(VERSES)
+    assert np.array_equal(batched.embed_verses(VERSES), np.stack(vectors))
+
+    topics = batched.process_surah("test", VERSES)
+    expected = StreamProcessor(engine, threshold=0.9).process_surah("test", VERSES, vectors)
+
+    assert [[v["ayah"] for v in t["verses"]] for t in topics] == [[1, 2], [3, 4], [5]]
+    assert [[v["ayah"] for v in t["verses"]] for t in topics] == [
+        [v["ayah"] for v in t["verses"]] for t in expected
+    ]
+
+
+def test_one_model_call_per_batch():
+    engine = CountingEngine()
+    StreamProcessor(engine, batch_size=2).process_surah("test", VERSES)
+    assert engine.single_calls == 0
+    assert engine.batch_calls == 3
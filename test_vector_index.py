@@ -0,0 +1,68 @@
+"""
+VectorIndex: cosine scores, argpartition top-k, batched queries
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from search.vector_index import VectorIndex, top_k
+
+
+def sample(n=400, dim=24, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, dim)), rng.normal(size=(15, dim))
+
+
+def cosine(a, b):
+    return a @ b / (np.linalg.norm(a) * np.linalg.norm(b))
+
+
+def test_rows_are_stored_normalized_float32():
+    vectors, _ = sample()
+    index = VectorIndex(vectors)
+    assert index.vectors.dtype == np.float32
+    assert np.allclose(np.linalg.norm(index.vectors, axis=1), 1.0, atol=1e-5)
+    assert (len(index), index.dim) == (400, 24)
+
+    unit = index.vectors
+    assert VectorIndex(unit, normalized=True).vectors is unit  # no copy (mmap stays mapped)
+
+
+def test_search_matches_full_sort():
+    vectors, queries = sample()
+    index = VectorIndex(vectors)
+    for q in queries:
+        sims = np.array([cosine(v, q) for v in vectors])
+        rows, scores = index.search(q, k=6)
+        assert rows.tolist() == np.argsort(-sims, kind="stable")[:6].tolist()
+        assert np.allclose(scores, sims[rows], atol=1e-5)
+        assert np.allclose(index.scores(q), sims, atol=1e-5)
+
+
+def test_batch_equals_single_queries():
+    vectors, queries = sample()
+    index = VectorIndex(vectors)
+    rows, scores = index.search_many(queries, k=4)
+    assert rows.shape == scores.shape == (len(queries), 4)
+    for q, r, s in zip(queries, rows, scores):
+        single_rows, single_scores = index.search(q, k=4)
+        assert r.tolist() == single_rows.tolist()
+        assert np.allclose(s, single_scores)
+
+
+def test_above_threshold_in_row_order():
+    vectors, queries = sample()
+    index = VectorIndex(vectors)
+    rows, scores = index.above(queries[0], 0.2)
+    expected = [i for i, v in enumerate(vectors) if cosine(v, queries[0]) >= 0.2]
+    assert rows.tolist() == expected
+    assert (scores >= 0.2).all()
+
+
+def test_k_bounds():
+    vectors, queries = sample(n=3)
+    index = VectorIndex(vectors)
+    assert len(index.search(queries[0], k=10)[0]) == 3
+    rows, scores = top_k(np.zeros((2, 5)), 0)
+    assert rows.shape == scores.shape == (2, 0)
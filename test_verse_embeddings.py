@@ -0,0 +1,92 @@
+"""
+Verse embedding matrix: build, persisted .npy (memory-mapped) and scoring
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from search.index import SearchIndex
+from test_corpus import make_corpus
+from verse_embeddings import (
+    build_embeddings, embeddings_path, load_embeddings, similarities
+)
+
+
+class LetterCountEncoder:
+    """Deterministic stand-in for a SentenceTransformer: letter histograms"""
+
+    def encode(self, texts, batch_size=None):
+        if isinstance(texts, str):
+            return self.encode([texts])[0]
+        rows = np.zeros((len(texts), 64), dtype=np.float32)
+        for r, text in enumerate(texts):
+            for c in text:
+                rows[r, ord(c) % 64] += 1
+        return rows
+
+
+def test_build_and_mmap_load(tmp_path):
+    corpus = make_corpus(tmp_path)
+    built = build_embeddings(corpus, LetterCountEncoder(), model_name="letters")
+
+    matrix = load_embeddings(corpus, model_name="letters")
+    assert isinstance(matrix, np.memmap)
+    assert matrix.dtype == np.float32 and matrix.shape == (len(corpus), 64)
+    assert np.allclose(np.linalg.norm(matrix, axis=1), 1.0)
+    assert np.array_equal(matrix, built)
+
+    # Another model (or snapshot) never reuses the file
+    assert load_embeddings(corpus, model_name="other") is None
+    assert embeddings_path(corpus).endswith("_embeddings.npy")
+
+
+def test_semantic_stage_is_one_product(tmp_path):
+    corpus = make_corpus(tmp_path)
+    encoder = LetterCountEncoder()
+    build_embeddings(corpus, encoder, model_name="letters")
+    matrix = load_embeddings(corpus, model_name="letters")
+
+    q_vec = encoder.encode(corpus.normalized("semantic")[2])
+    sims = similarities(matrix, q_vec)
+    expected = [
+        float(np.dot(row, q_vec) / np.linalg.norm(q_vec)) for row in np.asarray(matrix)
+    ]
+    assert np.allclose(sims, expected, atol=1e-6)
+    assert int(np.argmax(sims)) == 2
+
+    index = SearchIndex(corpus.verses(), embeddings=matrix)
+    hits = index.semantic(q_vec, threshold=0.99)
+    assert [row for row, _ in hits] == [2]
+    assert hits[0][1] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_compact_copy_tracks_corpus_version(tmp_path):
+    from verse_embeddings import load_compact, save_compact
+
+    corpus = make_corpus(tmp_path)
+    matrix = build_embeddings(corpus, LetterCountEncoder(), model_name="letters")
+    save_compact(corpus, matrix, "int8")
+
+    compact = load_compact(corpus, "int8")
+    assert compact.fmt == "int8" and compact.version == corpus.version
+    assert int(np.argmax(compact.scores(matrix[3]))) == 3
+    assert load_compact(corpus, "float16") is None
+
+
+def test_ann_index_is_tagged_with_the_model(tmp_path):
+    from search.ann import load_index
+    from verse_embeddings import load_ann
+
+    corpus = make_corpus(tmp_path)
+    build_embeddings(corpus, LetterCountEncoder(), model_name="letters")
+    index = load_ann(corpus, model_name="letters", backend="exact")
+    assert index.search(np.asarray(load_embeddings(corpus, model_name="letters"))[1], k=1)[0][0] == 1
+
+    ann_path = embeddings_path(corpus).replace(".npy", ".ann.npz")
+    assert load_index(ann_path, version=f"{corpus.version}:letters") is not None
+    # Same snapshot, another model: the saved index is not reused
+    other = np.eye(len(corpus), 8, dtype=np.float32)
+    rebuilt = load_ann(corpus, other, model_name="other", backend="exact")
+    assert np.array_equal(rebuilt.vectors, other)
+    assert load_index(ann_path, version=f"{corpus.version}:letters") is None
@@ -0,0 +1,154 @@
+"""
+Verse Embeddings - مصفوفة متجهات الآيات
+
+One float32 row per verse (corpus row order), L2-normalized, built offline
+and saved as a plain .npy next to the corpus snapshot. At startup it is
+opened with mmap_mode="r": nothing is read until the first query, and the
+pages are shared between worker processes. Cosine similarity of a query
+against every verse is then a single matrix-vector product.
+
+Build (or rebuild after the snapshot changed) with:
+    python verse_embeddings.py
+"""
+
+import json
+import os
+
+import numpy as np
+
+from corpus import SNAPSHOT_FILE, load_corpus
+
+# =========================================================
+# CONFIGURATION
+# =========================================================
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+PROFILE = "semantic"  # text fed to the model: no diacritics / Quranic marks
+BATCH_SIZE = 64
+
+
+def embeddings_path(corpus):
+    """<snapshot>_embeddings.npy, with a .json sidecar holding its metadata"""
+    return os.path.splitext(corpus.path)[0] + "_embeddings.npy"
+
+
+def _meta_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+# =========================================================
+# BUILD
+# =========================================================
+def build_embeddings(corpus, model, path=None, model_name=MODEL_NAME, batch_size=BATCH_SIZE):
+    """
+    Encode every verse with `model` (anything with a SentenceTransformer-style
+    encode(list) -> array) and save the normalized float32 matrix.
+    """
+    path = path or embeddings_path(corpus)
+    texts = corpus.normalized(PROFILE)
+    matrix = np.asarray(model.encode(texts, batch_size=batch_size), dtype=np.float32)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    tmp = path + ".tmp.npy"
+    np.save(tmp, matrix)
+    os.replace(tmp, path)
+    meta = {
+        "corpus_version": corpus.version,
+        "model": model_name,
+        "profile": PROFILE,
+        "shape": list(matrix.shape),
+    }
+    with open(_meta_path(path), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return matrix
+
+
+# =========================================================
+# LOAD
+# =========================================================
+def load_embeddings(corpus, path=None, model_name=MODEL_NAME):
+    """
+    The memory-mapped matrix for this corpus, or None when it is missing or
+    was built for another snapshot / model (rebuild with python verse_embeddings.py).
+    """
+    path = path or embeddings_path(corpus)
+    if not (os.path.exists(path) and os.path.exists(_meta_path(path))):
+        return None
+    with open(_meta_path(path), encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("corpus_version") != corpus.version or meta.get("model") != model_name:
+        return None
+    matrix = np.load(path, mmap_mode="r")
+    if matrix.shape[0] != len(corpus):
+        return None
+    return matrix
+
+
+def save_compact(corpus, matrix, fmt, path=None):
+    """float16 / int8 copy of the verse matrix (quantization.py), tagged with the corpus version"""
+    from quantization import compact_path, compress
+
+    path = compact_path(path or embeddings_path(corpus), fmt)
+    compress(matrix, fmt, version=corpus.version).save(path)
+    return path
+
+
+def load_compact(corpus, fmt, path=None):
+    """The compact verse matrix, or None when missing or built for another snapshot"""
+    from quantization import CompactVectors, compact_path
+
+    path = compact_path(path or embeddings_path(corpus), fmt)
+    if not os.path.exists(path):
+        return None
+    compact = CompactVectors.load(path)
+    return compact if compact.version == corpus.version else None
+
+
+def load_ann(corpus, matrix=None, path=None, backend="ivf", model_name=MODEL_NAME):
+    """
+    Nearest-neighbour index (search/ann.py) over the verse matrix, saved as
+    <snapshot>_embeddings.ann.npz and rebuilt when the snapshot or the model
+    changed. None when there is no matrix for this corpus.
+
+    Only built here (for top-k tools); the semantic search stage needs every
+    verse above a threshold and scans the matrix (SearchIndex.semantic).
+    """
+    from search.ann import load_or_build
+
+    matrix = load_embeddings(corpus, model_name=model_name) if matrix is None else matrix
+    if matrix is None:
+        return None
+    path = os.path.splitext(path or embeddings_path(corpus))[0] + ".ann.npz"
+    return load_or_build(matrix, path, f"{corpus.version}:{model_name}", backend=backend)
+
+
+def similarities(matrix, q_vec):
+    """Cosine similarity of one query vector against every row"""
+    from search.vector_index import VectorIndex
+
+    return VectorIndex(matrix, normalized=True).scores(q_vec)
+
+
+# =========================================================
+# ENTRY POINT
+# =========================================================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the verse embedding matrix")
+    parser.add_argument("--snapshot", default=SNAPSHOT_FILE, help="Corpus snapshot path")
+    parser.add_argument("--model", default=MODEL_NAME, help="SentenceTransformer model")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--precision", choices=["float16", "int8"], help="Also write a compact copy")
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    from embedding_cache import CachedEncoder
+
+    corpus = load_corpus(args.snapshot)
+    model = CachedEncoder(SentenceTransformer(args.model), args.model)
+    matrix = build_embeddings(corpus, model, model_name=args.model, batch_size=args.batch_size)
+    print(f"✅ {matrix.shape[0]} × {matrix.shape[1]} float32 → {embeddings_path(corpus)}")
+    if args.precision:
+        print(f"✅ {args.precision} copy → {save_compact(corpus, matrix, args.precision)}")
+    index = load_ann(corpus, matrix, model_name=args.model)
+    print(f"✅ {index.kind} nearest-neighbour index over {len(index)} verses")